@@ -14,14 +14,15 @@ Last modified on Tue Nov 24 15:33 2020
 # Also make sure to submit your assignment1.py (or whatever you end up)
 # calling it, alongside this file so that the imports work!
 from typing_extensions import Annotated
-from ccbase.networks import Graph
+from ccbase.networks import Graph, GraphView
 from ccbase.nodes import Node
 ###
 # You should not really require numpy for this assignment, but you are free
 # to use it if you want.
 import numpy as np
 # Imports for type hints
-from typing import Union, List, Iterable
+from typing import Union, Optional, List, Dict, Iterable, Iterator, Set, Tuple, FrozenSet
+from collections import OrderedDict, deque
 
 ###
 # Note: If you use your own graph implementation, take care
@@ -91,6 +92,84 @@ def find_collider(dg: Graph) -> List[Union[Node, str]]:
     """
     return [node for node in dg.nodes if len(dg.get_parents(node)) >= 2]
 
+def motif_census(dg: Graph, return_indices: bool = False) -> Dict:
+    """
+        Finds all forks, chains, colliders and immoralities of the given 
+        directed graph in a single pass. The graph is converted once into
+        integer edge arrays (a sparse adjacency matrix in coordinate format)
+        and all motifs are computed from these using vectorized numpy 
+        operations, which scales to graphs with millions of edges.
+
+        Parameters
+        ----------
+        dg: ccbase.networks.Graph
+            The directed graph whose motifs are to be found.
+        return_indices: bool, optional
+            If True, the motifs are returned as numpy arrays of node indices
+            into the list stored under "names" instead of node names, which
+            avoids creating Python objects for every motif. Default False.
+
+        Returns
+        -------
+        dict
+            A dictionary with the keys "forks", "chains" and "colliders",
+            containing the same nodes as find_forks, find_chains and 
+            find_collider, and "immoralities" containing the same dictionary
+            as find_immoralities. 
+            With return_indices, the first three are index arrays, 
+            "immoralities" is an (k, 3) array of (collider, parent, parent)
+            rows and "names" holds the node names for the indices.
+    """
+    names = list(dg.nodes)
+    index = {name: i for i, name in enumerate(names)}
+    num_nodes = len(names)
+    children = [dg.nodes[name].children for name in names]
+    out_degree = np.fromiter((len(c) for c in children), dtype=np.int64, count=num_nodes)
+    src = np.repeat(np.arange(num_nodes, dtype=np.int64), out_degree)
+    dst = np.fromiter((index[c] for c_dict in children for c in c_dict), 
+                        dtype=np.int64, count=int(out_degree.sum()))
+    in_degree = np.bincount(dst, minlength=num_nodes)
+
+    forks = np.flatnonzero(out_degree >= 2)
+    chains = np.flatnonzero((out_degree > 0) & (in_degree > 0))
+    colliders = np.flatnonzero(in_degree >= 2)
+
+    # Group the parents by their child, then enumerate all pairs of parents 
+    # within each group: each parent is paired with all following parents.
+    order = np.argsort(dst, kind="stable")
+    grouped_parents = src[order]
+    grouped_children = dst[order]
+    group_end = np.cumsum(in_degree)[grouped_children]
+    followers = group_end - np.arange(len(grouped_children)) - 1
+    first = np.repeat(np.arange(len(grouped_children)), followers)
+    run_start = np.repeat(np.cumsum(followers) - followers, followers)
+    second = first + 1 + (np.arange(len(first)) - run_start)
+    parent_a = grouped_parents[first]
+    parent_b = grouped_parents[second]
+    pair_children = grouped_children[first]
+
+    # Keep only pairs of parents that are not adjacent, using sorted 
+    # undirected edge keys as a sparse adjacency lookup
+    edge_keys = np.unique(np.minimum(src, dst) * num_nodes + np.maximum(src, dst))
+    pair_keys = np.minimum(parent_a, parent_b) * num_nodes + np.maximum(parent_a, parent_b)
+    positions = np.searchsorted(edge_keys, pair_keys)
+    adjacent = positions < len(edge_keys)
+    adjacent[adjacent] = edge_keys[positions[adjacent]] == pair_keys[adjacent]
+    immoral = ~adjacent
+    immoralities = np.stack([pair_children[immoral], parent_a[immoral], parent_b[immoral]], axis=1)
+
+    if return_indices:
+        return {"names": names, "forks": forks, "chains": chains, 
+                "colliders": colliders, "immoralities": immoralities}
+
+    immoral_pairs = {names[c]: [] for c in colliders}
+    for child, p_a, p_b in immoralities.tolist():
+        immoral_pairs[names[child]].append(sorted((names[p_a], names[p_b])))
+    return {"forks": [names[i] for i in forks],
+            "chains": [names[i] for i in chains],
+            "colliders": [names[i] for i in colliders],
+            "immoralities": {k: sorted(v) for k, v in immoral_pairs.items()}}
+
 
 ### Exercise 2: Markov Equality
 
@@ -194,12 +273,186 @@ def markov_equivalent(graph1: Graph, graph2: Graph) -> bool:
         bool
             True if the two graphs are Markov equivalent, False otherwise.
     """
-    return (find_immoralities(graph1) == find_immoralities(graph2)) and same_skeleton(graph1,graph2)
+    # Two DAGs are Markov equivalent exactly if they share the same CPDAG
+    return get_cpdag(graph1) == get_cpdag(graph2)
+
+def get_cpdag(graph: Graph) -> Tuple[FrozenSet[str], FrozenSet[Tuple[str, str]], FrozenSet[FrozenSet[str]]]:
+    """
+        Computes the CPDAG (completed partially directed acyclic graph, also
+        called essential graph) of the given DAG. The CPDAG is a canonical 
+        representation of the Markov equivalence class of the graph: Two DAGs
+        are Markov equivalent exactly if their CPDAGs are equal.
+        Edges that are part of an immorality are directed, all remaining 
+        edges are directed according to Meek's orientation rules 1-3 if 
+        they are compelled and stay undirected otherwise.
+
+        Parameters
+        ----------
+        graph: ccbase.networks.Graph or equivalent
+            The directed acyclic graph whose CPDAG is to be computed.
+
+        Returns
+        -------
+        tuple
+            A hashable triple (nodes, directed, undirected) containing the 
+            frozenset of node names, the frozenset of directed edges as
+            (parent, child) tuples and the frozenset of undirected edges as 
+            frozensets of the two node names.
+    """
+    adjacent = {}
+    for name, node in graph.nodes.items():
+        adjacent[name] = set(node.parents) | set(node.children)
+
+    # Directed edges, stored from both ends, and undirected edges
+    into = {name: set() for name in adjacent}
+    out_of = {name: set() for name in adjacent}
+    undirected = {name: set(neighbours) for name, neighbours in adjacent.items()}
+
+    def _orient(parent, child):
+        undirected[parent].discard(child)
+        undirected[child].discard(parent)
+        into[child].add(parent)
+        out_of[parent].add(child)
+
+    # Immoralities: parent_a -> child <- parent_b with parent_a, parent_b not adjacent
+    for name, node in graph.nodes.items():
+        parents = list(node.parents)
+        for index, parent_a in enumerate(parents):
+            for parent_b in parents[index+1:]:
+                if parent_b not in adjacent[parent_a]:
+                    _orient(parent_a, name)
+                    _orient(parent_b, name)
+
+    changed = True
+    while changed:
+        changed = False
+        for node_b in adjacent:
+            for node_c in list(undirected[node_b]):
+                # Rule 1: a -> b - c and a, c not adjacent => b -> c
+                if any(node_c not in adjacent[node_a] for node_a in into[node_b]):
+                    _orient(node_b, node_c)
+                    changed = True
+                # Rule 2: b -> a -> c and b - c => b -> c
+                elif out_of[node_b] & into[node_c]:
+                    _orient(node_b, node_c)
+                    changed = True
+                # Rule 3: b - a1 -> c, b - a2 -> c, b - c, a1, a2 not adjacent => b -> c
+                else:
+                    candidates = list(undirected[node_b] & into[node_c])
+                    if any(a2 not in adjacent[a1] for i, a1 in enumerate(candidates) 
+                                                    for a2 in candidates[i+1:]):
+                        _orient(node_b, node_c)
+                        changed = True
+
+    directed = frozenset((parent, child) for child, parents in into.items() for parent in parents)
+    undirected_edges = frozenset(frozenset((a, b)) for a, neighbours in undirected.items() for b in neighbours)
+    return frozenset(adjacent), directed, undirected_edges
+
+def group_markov_equivalent(graphs: Iterable[Graph]) -> List[List[int]]:
+    """
+        Groups the given DAGs into their Markov equivalence classes by 
+        hashing their CPDAGs, which requires only one CPDAG computation per
+        graph instead of pairwise comparisons.
+
+        Parameters
+        ----------
+        graphs: iterable of ccbase.networks.Graph or equivalent
+            The directed acyclic graphs to be grouped.
+
+        Returns
+        -------
+        list of lists of int
+            The equivalence classes, each given as the list of the indices of
+            its graphs within graphs. Classes are ordered by their first graph.
+    """
+    classes = {}
+    for index, graph in enumerate(graphs):
+        classes.setdefault(get_cpdag(graph), []).append(index)
+    return list(classes.values())
 
 ## Exercise 3: Paths
 
+def iter_paths(graph: Graph, node_x: Union[Node, str], node_y: Union[Node, str],
+                max_length: Optional[int] = None, 
+                max_count: Optional[int] = None) -> Iterator[List[str]]:
+    """
+        Lazily generates the undirected paths between node_x and node_y within
+        the (directed or undirected) graph. Uses an explicit stack instead of 
+        recursion and only ever keeps the current path in memory, so callers
+        can stop as soon as they found the path they were looking for.
+
+        Parameters
+        ----------
+        graph: ccbase.networks.Graph or ccbase.networks.GraphView
+            The graph in which to compute the paths. This may be directed or
+            undirected.
+        node_x: ccbase.nodes.Node or String
+            The node object or name for the first of the two nodes.
+        node_y: ccbase.nodes.Node or String
+            The node object or name for the second of the two nodes.
+        max_length: int, optional
+            If given, only paths with at most this many edges are generated.
+        max_count: int, optional
+            If given, the generator stops after this many paths.
+
+        Yields
+        ------
+        list of Strings
+            The names of the nodes of one undirected path from node_x to node_y,
+            including the starting and end nodes.
+    """
+    source = graph.nodes[node_x].name
+    target = graph.nodes[node_y].name
+    if max_count is not None and max_count <= 0:
+        return
+
+    get_neighbours = getattr(graph, "get_neighbours", None)
+    def _neighbours(name):
+        if get_neighbours is not None:
+            return iter(get_neighbours(name))
+        node = graph.nodes[name]
+        # dict.fromkeys removes duplicates (undirected graphs store each edge
+        # both as parent and child) while keeping a deterministic order.
+        return iter(dict.fromkeys(list(node.children) + list(node.parents)))
+
+    if source == target:
+        yield [source]
+        return
+
+    count = 0
+    path = [source]
+    on_path = {source}
+    stack = [_neighbours(source)]
+    while stack:
+        neighbour = next(stack[-1], None)
+        if neighbour is None:
+            # All neighbours of the last node on the path have been explored
+            stack.pop()
+            on_path.discard(path.pop())
+            continue
+        if neighbour in on_path:
+            continue
+        if neighbour == target:
+            # The path to the target has len(path) edges
+            if max_length is not None and len(path) > max_length:
+                continue
+            yield path + [target]
+            count += 1
+            if max_count is not None and count >= max_count:
+                return
+            continue
+        if max_length is not None and len(path) >= max_length:
+            # Extending the path any further cannot reach the target in time
+            continue
+        path.append(neighbour)
+        on_path.add(neighbour)
+        stack.append(_neighbours(neighbour))
+
+
 def get_paths(graph: Graph, node_x: Union[Node, str], 
-                    node_y: Union[Node, str]) -> List[List[Union[Node, str]]]:
+                    node_y: Union[Node, str],
+                    max_length: Optional[int] = None, 
+                    max_count: Optional[int] = None) -> List[List[Union[Node, str]]]:
     """
         Computes all undirected paths between node_x and node_y within
         the (directed or undirected) graph.
@@ -213,6 +466,10 @@ def get_paths(graph: Graph, node_x: Union[Node, str],
             The node object or name for the first of the two nodes.
         node_y: ccbase.nodes.Node or String
             The node object or name for the second of the two nodes.
+        max_length: int, optional
+            If given, only paths with at most this many edges are returned.
+        max_count: int, optional
+            If given, at most this many paths are returned.
 
         Returns
         --------
@@ -221,34 +478,8 @@ def get_paths(graph: Graph, node_x: Union[Node, str],
             an undirected path from node_x to node_y. These paths should contain
             the starting and end nodes as well.
     """
-    paths: list[list] = list()
-    current_path: list[Node]  = list()
-    visited_nodes: dict = dict()
-
-    def undirect_path(node_a, node_b):
-        """If already visited return"""
-        if visited_nodes.get(node_a, False):
-            return
-        """Check visited and append it"""
-        visited_nodes[node_a] = True
-        current_path.append(node_a)
-
-        """If a==b I'm on the destination node"""
-        if node_a == node_b:
-            paths.append(current_path.copy())
-            visited_nodes[node_a] = False
-            """Popping the list until next children/parent original caller"""
-            current_path.pop()
-            return
-        """Recursive call to get all undirect path"""
-        for child in set(graph.get_children(node_a) + graph.get_parents(node_a)):
-            undirect_path(child, node_b)
-
-        visited_nodes[node_a] = False
-        current_path.pop()
+    return list(iter_paths(graph, node_x, node_y, max_length, max_count))
 
-    undirect_path(node_x, node_y)
-    return paths
 ## Exercise 4: D-Separation
 
 def is_collider(dg: Graph, node: Union[Node, str], 
@@ -319,15 +550,16 @@ def is_path_open(dg: Graph, path: List[Union[Node,str]],
     if len(path) == 0 or dg is None or len(dg.nodes) == 0:
         return True
     else:
+        # A collider is opened by itself or any of its descendants being given,
+        # i.e. exactly if it is part of the ancestral closure of nodes_z.
+        z_ancestors = None
         # Skip first and last node in path
         for node in path[1:-1]:
             if is_collider(dg, node, path):
+                if z_ancestors is None:
+                    z_ancestors = get_ancestral_closure(dg, [z for z in nodes_z if z in dg.nodes])
                 # Collider: "closed" if neither node in the center nor any of its descendants are given as evidence
-                collider_closed = True
-                for evidence in nodes_z:
-                    if evidence == node or evidence in dg.get_descendants(node):
-                        collider_closed = False
-                if collider_closed:
+                if dg.nodes[node].name not in z_ancestors:
                     return False
             else:
                 # Non-collider: "closed" if node in the center is given as evidence
@@ -361,15 +593,105 @@ def unblocked_path_exists(dg: Graph, node_x: Union[Node, str],
             False if all undirected paths between node_x and node_y are blocked 
             given the nodes_z, True otherwise.
     """
-    # Get all undirected paths between node_x and node_y
-    paths = get_paths(dg, node_x, node_y)
-    # Check every path until an open path is found
-    for path in paths:
+    # Lazily generate the undirected paths between node_x and node_y and
+    # stop at the first open path
+    for path in iter_paths(dg, node_x, node_y):
         if is_path_open(dg, path, nodes_z):
             return True
     # Couldn't find an open path
     return False
 
+def get_ancestral_closure(dg: Graph, nodes: Iterable[Union[Node, str]]) -> Set[str]:
+    """
+        Computes the names of the given nodes together with all their ancestors.
+
+        Parameters
+        ----------
+        dg: ccbase.networks.Graph
+            The directed graph that should contain all the nodes.
+        nodes: iterable of ccbase.nodes.Node or String
+            The nodes whose ancestors are to be collected.
+
+        Returns
+        -------
+        set of String
+            The names of the given nodes and all their ancestors.
+    """
+    closure = set()
+    stack = []
+    for node in nodes:
+        name = dg.nodes[node].name
+        if name not in closure:
+            closure.add(name)
+            stack.append(name)
+    while stack:
+        for parent in dg.nodes[stack.pop()].parents:
+            if parent not in closure:
+                closure.add(parent)
+                stack.append(parent)
+    return closure
+
+
+def get_reachable_nodes(dg: Graph, nodes_x: Iterable[Union[Node, str]],
+            nodes_z: Iterable[Union[Node, str]], z_ancestors: Set[str] = None) -> Set[str]:
+    """
+        Computes all nodes that are reachable from nodes_x via an active trail
+        given nodes_z (the "Reachable" algorithm from Koller & Friedman, 
+        Algorithm 3.1, which is equivalent to Bayes-Ball). 
+        Every node and direction is visited at most once, so this runs in 
+        linear time in the size of the graph.
+
+        Parameters
+        ----------
+        dg: ccbase.networks.Graph
+            The directed graph that should contain all the nodes.
+        nodes_x: iterable of ccbase.nodes.Node or String
+            The source nodes of the active trails.
+        nodes_z: iterable of ccbase.nodes.Node or String
+            The set of conditioned nodes.
+        z_ancestors: set of String, optional
+            The names of nodes_z and all their ancestors, if these are already
+            known (see get_ancestral_closure). Will be computed otherwise.
+
+        Returns
+        -------
+        set of String
+            The names of all nodes that are not d-separated from nodes_x
+            given nodes_z. Nodes in nodes_z are never considered reachable.
+    """
+    z_names = {dg.nodes[z].name for z in nodes_z}
+    if z_ancestors is None:
+        z_ancestors = get_ancestral_closure(dg, z_names)
+
+    # Directions: True if we arrived at a node from one of its children ("up"),
+    # False if we arrived from one of its parents ("down").
+    to_visit = [(dg.nodes[x].name, True) for x in nodes_x]
+    visited = set()
+    reachable = set()
+    while to_visit:
+        name, up = to_visit.pop()
+        if (name, up) in visited:
+            continue
+        visited.add((name, up))
+        observed = name in z_names
+        if not observed:
+            reachable.add(name)
+        node = dg.nodes[name]
+        if up:
+            # Trails through an unobserved node may continue in any direction.
+            if not observed:
+                to_visit.extend((p, True) for p in node.parents)
+                to_visit.extend((c, False) for c in node.children)
+        else:
+            # Chains continue downwards if the node is unobserved, v-structures
+            # are active if the node or one of its descendants is observed.
+            if not observed:
+                to_visit.extend((c, False) for c in node.children)
+            if name in z_ancestors:
+                to_visit.extend((p, True) for p in node.parents)
+    return reachable
+
+
 def check_independence(dg: Graph, nodes_x: Iterable[Union[Node, str]], 
         nodes_y: Iterable[Union[Node, str]], nodes_z: Iterable[Union[Node, str]]) -> bool:
     """
@@ -396,19 +718,324 @@ def check_independence(dg: Graph, nodes_x: Iterable[Union[Node, str]],
             True if all nodes in nodes_x are conditionally independent of all
             nodes in nodes_y given the nodes in nodes_z, False otherwise.
     """
-    # Iterate over all combinations of nodes in nodes_x and nodes_y
-    for node_x in nodes_x:
-        for node_y in nodes_y:
-            # node_x and node_y are dependent if there is an open path given nodes_z (they are not d-separated)
-            if unblocked_path_exists(dg, node_x, node_y, nodes_z):
-                return False
-    # Could not find a dependence between the two sets of nodes_x and nodes_y given nodes_z
-    return True
+    # A single traversal from all nodes in nodes_x finds every node connected to
+    # them by an active trail, instead of testing every path for every pair.
+    reachable = get_reachable_nodes(dg, nodes_x, nodes_z)
+    # nodes_x and nodes_y are dependent if any node in nodes_y is reachable (not d-separated)
+    return not any(dg.nodes[node_y].name in reachable for node_y in nodes_y)
+
+
+
+class IndependenceOracle:
+    """
+        Answers many conditional independence queries on the same directed graph.
+        The ancestral closure of each conditioning set nodes_z is only computed
+        once and then memoized, so that repeated queries with the same nodes_z
+        only pay for the reachability traversal.
+
+        The oracle assumes that the graph is not modified while it is used.
+        Call `clear_cache` after changing the graph.
+
+        Attributes
+        ----------
+        graph: ccbase.networks.Graph
+            The directed graph the queries refer to.
+        max_cached_sets: int
+            The maximum number of conditioning sets whose ancestral closure is 
+            kept. The least recently used closures are dropped first.
+    """
+
+    def __init__(self, graph: Graph, max_cached_sets: int = 10000):
+        self.graph = graph
+        self.max_cached_sets = max_cached_sets
+        self._closures = OrderedDict()
+
+    def _names(self, nodes: Iterable[Union[Node, str]]) -> FrozenSet[str]:
+        return frozenset(self.graph.nodes[n].name for n in nodes)
+
+    def get_ancestral_closure(self, nodes_z: Iterable[Union[Node, str]]) -> Set[str]:
+        """
+            Returns the names of nodes_z and all their ancestors, using the
+            memoized result if this conditioning set was seen before.
+
+            Parameters
+            ----------
+            nodes_z: iterable of ccbase.nodes.Node or String
+                The set of conditioned nodes.
+
+            Returns
+            -------
+            set of String
+                The names of nodes_z and all their ancestors. Do not modify
+                the returned set, it is shared with the cache.
+        """
+        key = self._names(nodes_z)
+        try:
+            self._closures.move_to_end(key)
+            return self._closures[key]
+        except KeyError:
+            closure = get_ancestral_closure(self.graph, key)
+            self._closures[key] = closure
+            if len(self._closures) > self.max_cached_sets:
+                self._closures.popitem(last=False)
+            return closure
+
+    def reachable(self, nodes_x: Iterable[Union[Node, str]], 
+                    nodes_z: Iterable[Union[Node, str]]) -> Set[str]:
+        """
+            Computes all nodes that are not d-separated from nodes_x given nodes_z.
+
+            Parameters
+            ----------
+            nodes_x: iterable of ccbase.nodes.Node or String
+                The source nodes of the active trails.
+            nodes_z: iterable of ccbase.nodes.Node or String
+                The set of conditioned nodes.
+
+            Returns
+            -------
+            set of String
+                The names of all nodes reachable from nodes_x via an active trail.
+        """
+        nodes_z = self._names(nodes_z)
+        return get_reachable_nodes(self.graph, nodes_x, nodes_z, 
+                                    self.get_ancestral_closure(nodes_z))
+
+    def is_independent(self, nodes_x: Iterable[Union[Node, str]], 
+                        nodes_y: Iterable[Union[Node, str]], 
+                        nodes_z: Iterable[Union[Node, str]]) -> bool:
+        """
+            Same as `check_independence`, but reusing the memoized ancestral closures.
+
+            Returns
+            -------
+            bool
+                True if all nodes in nodes_x are conditionally independent of all
+                nodes in nodes_y given the nodes in nodes_z, False otherwise.
+        """
+        reachable = self.reachable(nodes_x, nodes_z)
+        return not any(self.graph.nodes[y].name in reachable for y in nodes_y)
+
+    def check_batch(self, queries: Iterable[Tuple[Iterable, Iterable, Iterable]]) -> List[bool]:
+        """
+            Answers a batch of conditional independence queries. Queries sharing
+            the same nodes_x and nodes_z are answered from a single traversal.
+
+            Parameters
+            ----------
+            queries: iterable of (nodes_x, nodes_y, nodes_z) tuples
+                The queries to answer, see `is_independent`.
+
+            Returns
+            -------
+            list of bool
+                The answer to each query, in the order of the queries.
+        """
+        reachable_sets = {}
+        results = []
+        for nodes_x, nodes_y, nodes_z in queries:
+            key = (self._names(nodes_x), self._names(nodes_z))
+            if key not in reachable_sets:
+                reachable_sets[key] = self.reachable(*key)
+            reachable = reachable_sets[key]
+            results.append(not any(self.graph.nodes[y].name in reachable for y in nodes_y))
+        return results
+
+    def clear_cache(self):
+        """
+            Drops all memoized ancestral closures, e.g. after the graph changed.
+        """
+        self._closures.clear()
+
+
+def _extend_closure(dg: Graph, closure: Set[str], node: str):
+    """
+        Private helper adding node and all its ancestors that are not yet
+        part of the given ancestral closure to it (in place).
+    """
+    if node in closure:
+        return
+    closure.add(node)
+    stack = [node]
+    while stack:
+        for parent in dg.nodes[stack.pop()].parents:
+            if parent not in closure:
+                closure.add(parent)
+                stack.append(parent)
+
+
+class DynamicIndependenceOracle(IndependenceOracle):
+    """
+        An independence oracle that subscribes to the modifications of its
+        graph and keeps a set of standing conditional independence queries
+        up to date.
+
+        The answer to a query (nodes_x, nodes_y, nodes_z) only depends on the 
+        subgraph formed by the ancestors of all its nodes. Adding or removing 
+        an edge node1 -> node2 can therefore only change the answer if node2 
+        is part of that ancestral set. Only such queries are re-answered, and
+        memoized ancestral closures are extended in place when edges are 
+        added instead of being recomputed. The answer of an invalidated query
+        itself is recomputed in full by a new d-separation check, it is not
+        updated incrementally.
+
+        Call `close` to stop listening to the graph.
+    """
+
+    def __init__(self, graph: Graph, max_cached_sets: int = 10000):
+        super(DynamicIndependenceOracle, self).__init__(graph, max_cached_sets)
+        # query id -> (nodes_x, nodes_y, nodes_z, ancestral set or None, answer or None)
+        self._queries = {}
+        self._next_id = 0
+        graph.subscribe(self._on_change)
+
+    def close(self):
+        """
+            Stops listening to modifications of the graph.
+        """
+        self.graph.unsubscribe(self._on_change)
+
+    def register_query(self, nodes_x: Iterable[Union[Node, str]], 
+                        nodes_y: Iterable[Union[Node, str]], 
+                        nodes_z: Iterable[Union[Node, str]]) -> int:
+        """
+            Adds a standing query that is kept up to date.
+
+            Parameters
+            ----------
+            nodes_x, nodes_y, nodes_z: iterable of ccbase.nodes.Node or String
+                The query as for `check_independence`.
+
+            Returns
+            -------
+            int
+                The id of the query, used for `answer` and `remove_query`.
+        """
+        query_id = self._next_id
+        self._next_id += 1
+        self._queries[query_id] = [self._names(nodes_x), self._names(nodes_y), 
+                                    self._names(nodes_z), None, None]
+        return query_id
+
+    def remove_query(self, query_id: int):
+        """
+            Removes the standing query with the given id.
+        """
+        del self._queries[query_id]
+
+    def answer(self, query_id: int) -> bool:
+        """
+            Returns the current answer to the given standing query. The query is 
+            only re-evaluated if a modification of the graph could have changed
+            its answer since it was last evaluated.
+
+            Returns
+            -------
+            bool
+                True if nodes_x and nodes_y are d-separated given nodes_z.
+        """
+        query = self._queries[query_id]
+        nodes_x, nodes_y, nodes_z, ancestral, result = query
+        if result is None:
+            if ancestral is None:
+                query[3] = get_ancestral_closure(self.graph, nodes_x | nodes_y | nodes_z)
+            result = self.is_independent(nodes_x, nodes_y, nodes_z)
+            query[4] = result
+        return result
+
+    def answers(self) -> Dict[int, bool]:
+        """
+            Returns
+            -------
+            dict
+                The current answers to all standing queries, keyed by their ids.
+        """
+        return {query_id: self.answer(query_id) for query_id in self._queries}
+
+    def _on_change(self, event: str, node1: str, node2: Optional[str]):
+        """
+            Callback for the graph's modifications, invalidating only the
+            information that may be affected.
+        """
+        if event == "add_node":
+            # A new node has no edges yet and can not change anything
+            return
+        if event == "remove_node":
+            for key in [key for key in self._closures if node1 in key]:
+                del self._closures[key]
+            for query in self._queries.values():
+                if query[3] is None or node1 in query[3]:
+                    query[3] = None
+                    query[4] = None
+            return
 
+        # Edge node1 -> node2 was added or removed
+        for key in list(self._closures):
+            closure = self._closures[key]
+            if node2 in closure:
+                if event == "add_edge":
+                    _extend_closure(self.graph, closure, node1)
+                else:
+                    del self._closures[key]
+        for query in self._queries.values():
+            ancestral = query[3]
+            if ancestral is None:
+                continue
+            if node2 in ancestral:
+                query[4] = None
+                if event == "add_edge":
+                    _extend_closure(self.graph, ancestral, node1)
+                else:
+                    query[3] = None
 
 
 ## Exercise 5: General graphical test 
 
+def make_ancestral_view(graph: Union[Graph, GraphView], nodes: Iterable[Union[Node, str]]) -> GraphView:
+    """
+        Creates a read-only view on the ancestral graph of the given graph for 
+        the given set of nodes, without copying any nodes.
+
+        Parameters
+        ----------
+        graph: ccbase.networks.Graph or ccbase.networks.GraphView
+            The (directed) graph from which to compute the ancestral graph.
+        nodes: Iterable of ccbase.nodes.Node or String
+            The set of nodes for which to compute the ancestral graph.
+
+        Returns
+        -------
+        ccbase.networks.GraphView
+            A view containing only the given nodes and their ancestors.
+    """
+    base = graph.graph if isinstance(graph, GraphView) else graph
+    return GraphView(graph, get_ancestral_closure(base, nodes))
+
+def make_moral_view(graph: Union[Graph, GraphView]) -> GraphView:
+    """
+        Creates a read-only, undirected view on the moral graph of the given
+        graph, i.e. the view additionally connects all parents of a common 
+        child, without copying any nodes.
+
+        Parameters
+        ----------
+        graph: ccbase.networks.Graph or ccbase.networks.GraphView
+            The (directed) graph or view from which to compute the moral graph.
+
+        Returns
+        -------
+        ccbase.networks.GraphView
+            The undirected view representing the moral graph.
+    """
+    view = graph if isinstance(graph, GraphView) else GraphView(graph)
+    marriages = []
+    for name in view.nodes:
+        parents = [p.name for p in view.get_parents(name)]
+        for index, parent in enumerate(parents):
+            for other_parent in parents[index+1:]:
+                marriages.append((parent, other_parent))
+    return GraphView(view, extra_edges=marriages, undirected=True)
+
 def make_ancestral_graph(graph: Graph, nodes: Iterable[Union[Node, str]]) -> Graph:
     """
         Computes the ancestral graph of the given graph for the given set of nodes.
@@ -425,27 +1052,9 @@ def make_ancestral_graph(graph: Graph, nodes: Iterable[Union[Node, str]]) -> Gra
         ccbase.networks.Graph
             The resulting ancestral graph.
     """
-    if len(nodes) == 0:
-        return Graph()
-
-    """To avoid problem if the list contains also string and Node"""
-    for index in range(0,len(nodes)):
-        nodes[index] = Node(str(nodes[index]))
-    """Copy graph"""
-    ancestor_list: list = nodes
-    ancestor_graph: Graph = graph.copy()
-    """Get ancestor of the nodes"""
-    for node in nodes:
-        ancestor_list = list(set(ancestor_list + list(graph.get_ancestors(node))))
-    """if the node is not in the ancestor list remove it"""
-    for node in graph.nodes:
-        if node not in ancestor_list:
-            ancestor_graph.remove_node(node)
-
-    # for node in ancestor_graph.nodes:
-    #     print(node , "->",ancestor_graph.get_children(node))
-    # print("fine ancestor")
-    return ancestor_graph
+    # Only the ancestral nodes are copied, instead of copying the whole graph
+    # and removing everything else afterwards.
+    return make_ancestral_view(graph, nodes).to_graph()
 
 def make_moral_graph(graph: Graph) -> Graph:
     """
@@ -462,19 +1071,7 @@ def make_moral_graph(graph: Graph) -> Graph:
         ccbase.networks.Graph
             The resulting moral graph which is undirected.
     """
-    morality_graph = graph.copy()
-    """Getting immoralities"""
-    immoralties: dict = find_immoralities(morality_graph)
-    for immoralities_vect in immoralties.values():
-        """For each parent in immorality add an edge between them"""
-        for immorality_tuple in immoralities_vect:
-            morality_graph.add_edge(immorality_tuple[0],immorality_tuple[1])
-    """Removing direction from edge"""
-    morality_graph = morality_graph.to_undirected()
-    # for node in morality_graph.nodes:
-    #     print(node , "->",morality_graph.get_children(node))
-    # print("fine morality")
-    return morality_graph
+    return make_moral_view(graph).to_graph()
 
 def separation(graph: Graph, nodes_z: Iterable[Union[Node, str]]) -> Graph:
     """
@@ -522,8 +1119,59 @@ def separation(graph: Graph, nodes_z: Iterable[Union[Node, str]]) -> Graph:
 
 
 
-def check_independence_general(graph: Graph, nodes_x: Iterable[Union[Node, str]], 
-            nodes_y: Iterable[Union[Node, str]], nodes_z: Iterable[Union[Node, str]]) -> bool:
+def get_connected_nodes(graph: Union[Graph, GraphView], nodes_x: Iterable[Union[Node, str]], 
+            nodes_z: Iterable[Union[Node, str]]) -> Set[str]:
+    """
+        Computes all nodes connected to any node in nodes_x via a path that
+        does not contain any node in nodes_z, ignoring edge directions.
+        Uses a single breadth first search over integer node ids, so that
+        every node and edge is visited at most once.
+
+        Parameters
+        ----------
+        graph: ccbase.networks.Graph or ccbase.networks.GraphView
+            The graph to search in. Edges are considered undirected.
+        nodes_x: iterable of ccbase.nodes.Node or String
+            The start nodes of the search.
+        nodes_z: iterable of ccbase.nodes.Node or String
+            The nodes that are removed from the graph.
+
+        Returns
+        -------
+        set of String
+            The names of all nodes connected to nodes_x, including the nodes
+            of nodes_x that are not contained in nodes_z.
+    """
+    if not isinstance(graph, GraphView):
+        graph = GraphView(graph, undirected=True)
+    names = list(graph.nodes)
+    index = {name: i for i, name in enumerate(names)}
+    # 1 marks nodes that were either already visited or are removed (in nodes_z)
+    closed = bytearray(len(names))
+    for node_z in nodes_z:
+        if node_z in graph.nodes:
+            closed[index[graph.nodes[node_z].name]] = 1
+
+    queue = deque()
+    for node_x in nodes_x:
+        i = index[graph.nodes[node_x].name]
+        if not closed[i]:
+            closed[i] = 1
+            queue.append(i)
+    connected = set()
+    while queue:
+        name = names[queue.popleft()]
+        connected.add(name)
+        for neighbour in graph.get_neighbours(name):
+            i = index[neighbour]
+            if not closed[i]:
+                closed[i] = 1
+                queue.append(i)
+    return connected
+
+def check_independence_general(graph: Union[Graph, GraphView], nodes_x: Iterable[Union[Node, str]], 
+            nodes_y: Iterable[Union[Node, str]], nodes_z: Iterable[Union[Node, str]],
+            moralize: bool = False) -> bool:
     """
         Computes whether or not nodes in nodes_x are conditionally 
         independend of nodes in nodes_y given nodes in nodes_z
@@ -531,8 +1179,9 @@ def check_independence_general(graph: Graph, nodes_x: Iterable[Union[Node, str]]
         
         Parameters
         ---------
-        dg: ccbase.networks.Graph
+        dg: ccbase.networks.Graph or ccbase.networks.GraphView
             The directed or undirected graph that should contain all the nodes.
+            Edges are considered undirected.
         nodes_x: iterable of ccbase.nodes.Node or String
             The nodes that should be conditionally independent of the nodes
             in nodes_y
@@ -542,6 +1191,11 @@ def check_independence_general(graph: Graph, nodes_x: Iterable[Union[Node, str]]
         nodes_z: iterable of ccbase.nodes.Node or String
             The set of nodes that should make nodes_x and nodes_y conditionally
             independent.
+        moralize: bool, optional
+            If True, the (directed) graph is first reduced to the moral graph
+            of the ancestral graph of all given nodes, which turns the test into
+            a test for d-separation. Both steps only create views on the graph
+            instead of copies. Default False.
             
         Returns
         ----------
@@ -549,17 +1203,125 @@ def check_independence_general(graph: Graph, nodes_x: Iterable[Union[Node, str]]
             True if all nodes in nodes_x are conditionally independent of all
             nodes in nodes_y given the nodes in nodes_z, False otherwise.
     """
-    """For each node"""
-    for node_x in nodes_x:
-        """For each node"""
-        for node_y in nodes_y:
-            """Getting every path"""
-            paths = get_paths(graph, node_x, node_y)
-            """For each path if it pass from a node in z it is dependent from z"""
-            for path in paths:
-                if not any(path_node in nodes_z for path_node in path):
-                    return False   
-    return True
+    if moralize:
+        graph = make_moral_view(make_ancestral_view(graph, list(nodes_x) + list(nodes_y) + list(nodes_z)))
+    elif not isinstance(graph, GraphView):
+        graph = GraphView(graph, undirected=True)
+    # There is a path avoiding nodes_z exactly if nodes_y are connected to
+    # nodes_x in the graph without nodes_z, so a single search is enough.
+    connected = get_connected_nodes(graph, nodes_x, nodes_z)
+    return not any(graph.nodes[node_y].name in connected for node_y in nodes_y)
+
+def _min_vertex_cut(graph: GraphView, sources: Set[str], sinks: Set[str], 
+                    cuttable: Set[str]) -> Optional[Set[str]]:
+    """
+        Private helper computing a minimum set of nodes from cuttable that
+        separates sources from sinks in the undirected graph, via max-flow 
+        (Edmonds-Karp) on the graph with every node split into an "in" and 
+        an "out" node. Only cuttable nodes get capacity 1, all other 
+        capacities are infinite.
+        Returns None if no such set exists.
+    """
+    names = list(graph.nodes)
+    index = {name: i for i, name in enumerate(names)}
+    # Node i is split into 2*i ("in") and 2*i+1 ("out"), followed by the
+    # super source and super sink.
+    source = 2 * len(names)
+    sink = source + 1
+    infinite = len(names) + 1
+    # Residual graph as parallel lists: target, capacity and reverse edge index
+    adjacency = [[] for _ in range(sink + 1)]
+    targets, capacities = [], []
+
+    def _add_arc(a, b, capacity):
+        adjacency[a].append(len(targets))
+        targets.append(b)
+        capacities.append(capacity)
+        adjacency[b].append(len(targets))
+        targets.append(a)
+        capacities.append(0)
+
+    for name, i in index.items():
+        _add_arc(2 * i, 2 * i + 1, 1 if name in cuttable else infinite)
+        for neighbour in graph.get_neighbours(name):
+            _add_arc(2 * i + 1, 2 * index[neighbour], infinite)
+    for name in sources:
+        _add_arc(source, 2 * index[name], infinite)
+    for name in sinks:
+        _add_arc(2 * index[name] + 1, sink, infinite)
+
+    flow = 0
+    while True:
+        # Breadth first search for a shortest augmenting path
+        incoming_arc = [-1] * (sink + 1)
+        incoming_arc[source] = -2
+        queue = deque([source])
+        while queue and incoming_arc[sink] == -1:
+            current = queue.popleft()
+            for arc in adjacency[current]:
+                target = targets[arc]
+                if capacities[arc] > 0 and incoming_arc[target] == -1:
+                    incoming_arc[target] = arc
+                    queue.append(target)
+        if incoming_arc[sink] == -1:
+            break
+        # All cuttable capacities are 1, so every augmenting path carries 1
+        current = sink
+        while current != source:
+            arc = incoming_arc[current]
+            capacities[arc] -= 1
+            capacities[arc ^ 1] += 1
+            current = targets[arc ^ 1]
+        flow += 1
+        if flow >= infinite:
+            return None
+
+    # The cut consists of all split nodes whose "in" half is still reachable
+    # from the source in the residual graph while the "out" half is not.
+    reachable = {i for i, arc in enumerate(incoming_arc) if arc != -1}
+    return {name for name, i in index.items() 
+                if 2 * i in reachable and 2 * i + 1 not in reachable}
+
+def find_minimal_separator(graph: Graph, nodes_x: Iterable[Union[Node, str]], 
+            nodes_y: Iterable[Union[Node, str]], 
+            restricted_to: Optional[Iterable[Union[Node, str]]] = None) -> Optional[Set[str]]:
+    """
+        Computes a smallest set of nodes Z, such that nodes_x and nodes_y are
+        d-separated given Z. 
+        Every minimal separator only contains ancestors of nodes_x and nodes_y,
+        for which d-separation is equivalent to separation in the moral graph
+        of the ancestral graph of nodes_x and nodes_y. A minimum vertex cut 
+        in that (moral ancestral) view is computed via max-flow, which takes
+        polynomial time.
+
+        Parameters
+        ----------
+        graph: ccbase.networks.Graph
+            The directed graph that should contain all the nodes.
+        nodes_x: iterable of ccbase.nodes.Node or String
+            The nodes that should be separated from nodes_y.
+        nodes_y: iterable of ccbase.nodes.Node or String
+            The nodes that should be separated from nodes_x.
+        restricted_to: iterable of ccbase.nodes.Node or String, optional
+            If given, the separator may only contain these nodes (e.g. the 
+            observable nodes). 
+
+        Returns
+        -------
+        set of String or None
+            The names of the nodes of a minimum size separator within the
+            allowed nodes (which is therefore also minimal), or None if 
+            nodes_x and nodes_y can not be d-separated by such nodes.
+    """
+    names_x = {graph.nodes[x].name for x in nodes_x}
+    names_y = {graph.nodes[y].name for y in nodes_y}
+    if names_x & names_y:
+        return None
+    moral_view = make_moral_view(make_ancestral_view(graph, names_x | names_y))
+    cuttable = set(moral_view.nodes) - names_x - names_y
+    if restricted_to is not None:
+        cuttable &= {graph.nodes[z].name for z in restricted_to}
+    return _min_vertex_cut(moral_view, names_x, names_y, cuttable)
 
 def create_example_graphs():
     """
@@ -0,0 +1,237 @@
+"""
+Benchmark suite for the structural algorithms of assignment3 on
+seeded random graphs from 10 up to 100k nodes.
+
+Every structural function is timed on each generated graph and its peak
+memory is recorded with tracemalloc. The results are written as JSON, so
+that they can be compared against an earlier run:
+
+    python benchmark.py --sizes 10 100 1000 --output baseline.json
+    python benchmark.py --sizes 10 100 1000 --baseline baseline.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+import assignment3 as solution
+from ccbase.networks import Graph
+
+
+######
+#
+# Graph generators
+#
+######
+
+def _empty_graph(num_nodes: int) -> Graph:
+    graph = Graph()
+    for i in range(num_nodes):
+        graph.add_node("n{}".format(i))
+    return graph
+
+def erdos_renyi_dag(num_nodes: int, avg_degree: float = 3.0, seed: int = 0) -> Graph:
+    """
+        Creates a random DAG with avg_degree * num_nodes / 2 edges i -> j with
+        i < j drawn uniformly, so that nodes have avg_degree neighbours on average.
+    """
+    rng = random.Random(seed)
+    graph = _empty_graph(num_nodes)
+    num_edges = int(avg_degree * num_nodes / 2)
+    edges = set()
+    # Sampling edges directly is much faster than testing all pairs
+    while len(edges) < min(num_edges, num_nodes * (num_nodes - 1) // 2):
+        i, j = rng.randrange(num_nodes), rng.randrange(num_nodes)
+        if i != j:
+            edges.add((min(i, j), max(i, j)))
+    for i, j in sorted(edges):
+        graph.add_edge("n{}".format(i), "n{}".format(j))
+    return graph
+
+def layered_network(num_nodes: int, num_layers: int = 5, parents_per_node: int = 2,
+                    seed: int = 0) -> Graph:
+    """
+        Creates a layered DAG in which every node has up to parents_per_node
+        parents in the previous layer.
+    """
+    rng = random.Random(seed)
+    graph = _empty_graph(num_nodes)
+    layer_size = max(1, num_nodes // num_layers)
+    for i in range(layer_size, num_nodes):
+        layer_start = (i // layer_size - 1) * layer_size
+        candidates = range(layer_start, min(layer_start + layer_size, i))
+        for parent in rng.sample(candidates, min(parents_per_node, len(candidates))):
+            graph.add_edge("n{}".format(parent), "n{}".format(i))
+    return graph
+
+def polytree(num_nodes: int, seed: int = 0) -> Graph:
+    """
+        Creates a random polytree, i.e. a DAG whose skeleton is a tree, by
+        connecting every node to one earlier node with a random direction.
+    """
+    rng = random.Random(seed)
+    graph = _empty_graph(num_nodes)
+    for i in range(1, num_nodes):
+        j = rng.randrange(i)
+        if rng.random() < 0.5:
+            graph.add_edge("n{}".format(j), "n{}".format(i))
+        else:
+            graph.add_edge("n{}".format(i), "n{}".format(j))
+    return graph
+
+def grid_dag(num_nodes: int, seed: int = 0) -> Graph:
+    """
+        Creates a (roughly) square grid with all edges pointing right and down.
+        The seed is unused, but kept for a uniform generator signature.
+    """
+    width = max(1, int(round(num_nodes ** 0.5)))
+    graph = _empty_graph(num_nodes)
+    for i in range(num_nodes):
+        if (i + 1) % width != 0 and i + 1 < num_nodes:
+            graph.add_edge("n{}".format(i), "n{}".format(i + 1))
+        if i + width < num_nodes:
+            graph.add_edge("n{}".format(i), "n{}".format(i + width))
+    return graph
+
+GENERATORS: Dict[str, Callable[..., Graph]] = {
+    "erdos_renyi": erdos_renyi_dag,
+    "layered": layered_network,
+    "polytree": polytree,
+    "grid": grid_dag,
+}
+
+
+######
+#
+# Benchmarks
+#
+######
+
+def _make_workloads(graph: Graph, seed: int, num_conditioned: int = 3) -> Dict[str, Callable[[], object]]:
+    """
+        Creates the function calls that are benchmarked on the given graph.
+        The query nodes are drawn with the given seed, so that runs with the
+        same parameters are comparable.
+    """
+    rng = random.Random(seed)
+    names = sorted(graph.nodes)
+    node_x, node_y = rng.sample(names, 2)
+    nodes_z = rng.sample([n for n in names if n not in (node_x, node_y)],
+                            min(num_conditioned, len(names) - 2))
+    return {
+        "find_immoralities": lambda: solution.find_immoralities(graph),
+        "motif_census": lambda: solution.motif_census(graph, return_indices=True),
+        # Path enumeration is exponential, so we only ask for a bounded number of
+        # paths with a bounded length
+        "get_paths": lambda: solution.get_paths(graph, node_x, node_y, max_length=10, max_count=1000),
+        "check_independence": lambda: solution.check_independence(graph, [node_x], [node_y], nodes_z),
+        "check_independence_general": lambda: solution.check_independence_general(graph, [node_x], [node_y], nodes_z),
+        "check_independence_moral": lambda: solution.check_independence_general(graph, [node_x], [node_y], nodes_z,
+                                                                                moralize=True),
+    }
+
+def _measure(function: Callable[[], object], repeats: int) -> Dict[str, float]:
+    """
+        Returns the best wall time out of repeats runs and the peak memory
+        allocated during a separate run (tracemalloc slows down the execution).
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(times), "peak_bytes": peak}
+
+def run_benchmarks(sizes: List[int], generators: Optional[List[str]] = None,
+                    functions: Optional[List[str]] = None, seed: int = 0,
+                    repeats: int = 3) -> dict:
+    """
+        Runs all requested benchmarks.
+
+        Parameters
+        ----------
+        sizes: list of int
+            The numbers of nodes of the generated graphs.
+        generators: list of String, optional
+            The names of the generators (see GENERATORS) to use. All by default.
+        functions: list of String, optional
+            The names of the functions to benchmark. All by default.
+        seed: int, optional
+            Seed for the graph generators and the query nodes.
+        repeats: int, optional
+            Number of timed runs per benchmark, the fastest one is reported.
+
+        Returns
+        -------
+        dict
+            A JSON serializable dictionary containing some meta information
+            and a list with one result entry per benchmark.
+    """
+    results = []
+    for generator_name in generators or GENERATORS:
+        for size in sizes:
+            graph = GENERATORS[generator_name](size, seed=seed)
+            num_edges = sum(len(node.children) for node in graph.nodes.values())
+            for function_name, function in _make_workloads(graph, seed).items():
+                if functions and function_name not in functions:
+                    continue
+                entry = {"generator": generator_name, "nodes": size, "edges": num_edges,
+                            "function": function_name}
+                entry.update(_measure(function, repeats))
+                results.append(entry)
+                print("{generator:>12} {nodes:>7} {function:>28}: {seconds:10.5f}s "
+                        "{peak_bytes:>12} bytes".format(**entry))
+    return {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__,
+                    "seed": seed, "repeats": repeats, "timestamp": time.time()},
+        "results": results,
+    }
+
+def compare(results: dict, baseline: dict):
+    """
+        Prints the speedup and memory ratio of every benchmark in results
+        relative to the same benchmark in the baseline.
+    """
+    def _key(entry):
+        return entry["generator"], entry["nodes"], entry["function"]
+    old = {_key(entry): entry for entry in baseline["results"]}
+    for entry in results["results"]:
+        if _key(entry) not in old:
+            continue
+        reference = old[_key(entry)]
+        speedup = reference["seconds"] / max(entry["seconds"], 1e-12)
+        memory = entry["peak_bytes"] / max(reference["peak_bytes"], 1)
+        print("{:>12} {:>7} {:>28}: {:8.2f}x faster, {:6.2f}x memory".format(
+                *_key(entry), speedup, memory))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--generators", nargs="+", choices=list(GENERATORS))
+    parser.add_argument("--functions", nargs="+")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="File to write the JSON results to.")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against.")
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(args.sizes, args.generators, args.functions,
+                                        args.seed, args.repeats)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(benchmark_results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(benchmark_results, json.load(f))
@@ -8,7 +8,7 @@ need our graph class and its subclass for Bayesian networks.
 """
 from __future__ import annotations
 import copy
-from typing import Union, Optional, List, Dict, Iterable
+from typing import Union, Optional, List, Dict, Iterable, Tuple, Callable
 
 from .nodes import Node
 
@@ -18,6 +18,55 @@ class Graph:
     
     def __init__(self):
         self.nodes = {}
+        self._observers = []
+
+    def __getstate__(self) -> dict:
+        """
+            Observers are bound to this graph instance and are therefore
+            not copied (or pickled) together with the graph.
+        """
+        state = dict(self.__dict__)
+        state["_observers"] = []
+        return state
+
+    def __setstate__(self, state: dict):
+        """
+            Restores a copied (or unpickled) graph without any observers,
+            which also allows loading states that do not contain them.
+        """
+        self.__dict__.update(state)
+        self._observers = []
+
+    def subscribe(self, callback: Callable[[str, str, Optional[str]], None]):
+        """
+            Registers a callback that is called after every modification of 
+            the graph's structure.
+
+            Parameters
+            ----------
+            callback: callable
+                Will be called as callback(event, node1, node2), where event
+                is one of "add_node", "remove_node", "add_edge" and "remove_edge",
+                node1 and node2 are the names of the affected nodes (node2 is 
+                None for the node events). Removing a node first reports the
+                removal of all its edges.
+        """
+        self._observers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, str, Optional[str]], None]):
+        """
+            Removes a callback previously registered via subscribe.
+
+            Parameters
+            ----------
+            callback: callable
+                The callback to be removed.
+        """
+        self._observers.remove(callback)
+
+    def _notify(self, event: str, node1: str, node2: Optional[str] = None):
+        for callback in list(self._observers):
+            callback(event, node1, node2)
         
     def add_node(self, node: Union[str, Node]):
         """
@@ -37,6 +86,8 @@ class Graph:
             self.nodes[node.name] = node
         except AttributeError: #We check for an attribute, rather than a type.
             self.nodes[node] = Node(node)
+        if self._observers:
+            self._notify("add_node", str(node))
         
     def remove_node(self, node: Union[str, Node]):
         """
@@ -50,8 +101,15 @@ class Graph:
         if not node in self.nodes:
             raise ValueError("The graph does not contain a node named {}".format(node))
         
-        self.nodes[node].destroy()
+        tmp_node = self.nodes[node]
+        edges = [(p, tmp_node.name) for p in tmp_node.parents] + \
+                [(tmp_node.name, c) for c in tmp_node.children]
+        tmp_node.destroy()
         del self.nodes[node]
+        if self._observers:
+            for node1, node2 in edges:
+                self._notify("remove_edge", node1, node2)
+            self._notify("remove_node", tmp_node.name)
         
     def add_edge(self, node1: Union[str, Node], node2: Union[str, Node]):
         """
@@ -78,6 +136,8 @@ class Graph:
         except KeyError:
             raise ValueError("At least one of your specified nodes ({},{}) " \
                              "is not contained in the graph".format(node1, node2))
+        if self._observers:
+            self._notify("add_edge", self.nodes[node1].name, self.nodes[node2].name)
             
     def remove_edge(self, node1: Union[str, Node], node2: Union[str, Node]):
         """
@@ -101,6 +161,8 @@ class Graph:
         except KeyError:
             raise ValueError("At least one of your specified nodes ({},{}) " \
                              "is not contained in the graph".format(node1, node2))
+        if self._observers:
+            self._notify("remove_edge", self.nodes[node1].name, self.nodes[node2].name)
             
     def get_number_of_nodes(self) -> int:
         """
@@ -195,14 +257,14 @@ class Graph:
         """
         if not node in self.nodes:
             raise ValueError("The graph does not contain a node called {}".format(node))
-        def _add_parents(tmpNode):
-            for p in tmpNode.parents.values():
-                if p in res:
-                    continue
-                res.add(p)
-                _add_parents(p)
+        # Iterative traversal, so that deep graphs do not hit the recursion limit
         res = set()
-        _add_parents(self.nodes[node])
+        stack = [self.nodes[node]]
+        while stack:
+            for p in stack.pop().parents.values():
+                if p not in res:
+                    res.add(p)
+                    stack.append(p)
         return res
 
     def is_ancestor(self, node_a: Union[str, Node], node_b: Union[str, Node]) -> bool:
@@ -236,14 +298,13 @@ class Graph:
             set
                 A set containing all descendant nodes of the specified node.
         """
-        def _add_children(tmp_node):
-            for p in tmp_node.children.values():
-                if p in res:
-                    continue
-                res.add(p)
-                _add_children(p)
         res = set()
-        _add_children(self.nodes[node])
+        stack = [self.nodes[node]]
+        while stack:
+            for c in stack.pop().children.values():
+                if c not in res:
+                    res.add(c)
+                    stack.append(c)
         return res
   
 
@@ -373,5 +434,183 @@ class Graph:
                 c.add_child(n)
                 n.add_parent(c)
         return res
-        
-        
\ No newline at end of file
+
+
+class GraphView:
+    """
+        A lightweight, read-only view on (a subgraph of) an existing graph.
+        Instead of copying nodes, the view only stores a mask of the visible
+        node names and optionally additional undirected edges, which makes 
+        it cheap to derive e.g. ancestral or moral graphs. 
+
+        Changes to the underlying graph are visible through the view, but
+        the view itself can not be modified.
+
+        Attributes
+        ----------
+        graph: Graph
+            The underlying graph.
+        mask: set or None
+            The names of the visible nodes or None if all nodes are visible.
+        nodes: dict
+            A dictionary containing name:Node pairs for all visible nodes.
+            These are the node objects of the underlying graph, NOT copies!
+        undirected: bool
+            If True, all edges are considered undirected, i.e. parents and 
+            children of a node are both its neighbours.
+    """
+
+    def __init__(self, graph: Union[Graph, GraphView], 
+                    nodes: Optional[Iterable[Union[str, Node]]] = None, 
+                    extra_edges: Optional[Iterable[Tuple[str, str]]] = None,
+                    undirected: bool = False):
+        """
+            Parameters
+            ----------
+            graph: Graph or GraphView
+                The graph to create the view for. If another view is given,
+                its mask, extra edges and direction are inherited.
+            nodes: iterable of String or Node, optional
+                The nodes that should be visible. All (visible) nodes of the
+                graph if not given.
+            extra_edges: iterable of (String, String), optional
+                Additional undirected edges between visible nodes.
+            undirected: bool, optional
+                Whether the view should be undirected. Views with extra edges
+                are always undirected.
+        """
+        self.extra_edges = {}
+        if isinstance(graph, GraphView):
+            for name, neighbours in graph.extra_edges.items():
+                self.extra_edges[name] = set(neighbours)
+            undirected = undirected or graph.undirected
+            mask = graph.mask
+            graph = graph.graph
+        else:
+            mask = None
+        self.graph = graph
+        if nodes is not None:
+            nodes = {graph.nodes[n].name for n in nodes}
+            mask = nodes if mask is None else nodes & mask
+        self.mask = mask
+        if mask is None:
+            self.nodes = graph.nodes
+        else:
+            self.nodes = {name: graph.nodes[name] for name in mask}
+        for node_a, node_b in extra_edges or ():
+            node_a = self.nodes[node_a].name
+            node_b = self.nodes[node_b].name
+            self.extra_edges.setdefault(node_a, set()).add(node_b)
+            self.extra_edges.setdefault(node_b, set()).add(node_a)
+        self.undirected = undirected or bool(self.extra_edges)
+
+    def __contains__(self, node: Union[str, Node]) -> bool:
+        return node in self.nodes
+
+    @property
+    def num_nodes(self) -> int:
+        """
+            Returns
+            -------
+            int
+                The number of visible nodes.
+        """
+        return len(self.nodes)
+
+    @property
+    def is_directed(self) -> bool:
+        """
+            Returns
+            -------
+            bool
+                False if the view is undirected, True otherwise.
+        """
+        return not self.undirected
+
+    def _visible(self, names: Iterable[str]) -> List[str]:
+        if self.mask is None:
+            return list(names)
+        return [n for n in names if n in self.mask]
+
+    def get_neighbours(self, node: Union[str, Node]) -> List[str]:
+        """
+            Parameters
+            ----------
+            node: String or Node
+                The name of the node whose neighbours are queried.
+
+            Returns
+            -------
+            list of String
+                The names of all visible nodes connected to the given node by
+                an edge, regardless of the direction of that edge.
+        """
+        try:
+            tmp_node = self.nodes[node]
+        except KeyError:
+            raise ValueError("The view does not contain a node called {}".format(node))
+        neighbours = dict.fromkeys(self._visible(tmp_node.children))
+        neighbours.update(dict.fromkeys(self._visible(tmp_node.parents)))
+        neighbours.update(dict.fromkeys(self._visible(self.extra_edges.get(tmp_node.name, ()))))
+        return list(neighbours)
+
+    def get_parents(self, node: Union[str, Node]) -> List[Node]:
+        """
+            Parameters
+            ----------
+            node: String or Node
+                The name of the node whose parents are queried.
+
+            Returns
+            -------
+            list
+                A list containing all visible parent nodes of the specified node.
+                In an undirected view, these are all its neighbours.
+        """
+        if self.undirected:
+            return [self.nodes[n] for n in self.get_neighbours(node)]
+        try:
+            return [self.nodes[n] for n in self._visible(self.nodes[node].parents)]
+        except KeyError:
+            raise ValueError("The view does not contain a node called {}".format(node))
+
+    def get_children(self, node: Union[str, Node]) -> List[Node]:
+        """
+            Parameters
+            ----------
+            node: String or Node
+                The name of the node whose children are queried.
+
+            Returns
+            -------
+            list
+                A list containing all visible children nodes of the specified node.
+                In an undirected view, these are all its neighbours.
+        """
+        if self.undirected:
+            return [self.nodes[n] for n in self.get_neighbours(node)]
+        try:
+            return [self.nodes[n] for n in self._visible(self.nodes[node].children)]
+        except KeyError:
+            raise ValueError("The view does not contain a node called {}".format(node))
+
+    def to_graph(self) -> Graph:
+        """
+            Materializes the view as a new, independent graph containing
+            new nodes for all visible nodes.
+
+            Returns
+            -------
+            Graph
+                A graph containing the visible nodes and edges of this view.
+                Undirected edges are represented in both directions.
+        """
+        res = Graph()
+        for name in self.nodes:
+            res.add_node(name)
+        for name in self.nodes:
+            for child in self.get_children(name):
+                res.add_edge(name, child.name)
+                if self.undirected:
+                    res.add_edge(child.name, name)
+        return res
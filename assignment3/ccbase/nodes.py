@@ -28,6 +28,9 @@ class Node:
             A dictionary containing child-name:Node pairs for children of this node
 
     """
+    # Nodes are created in large numbers for bigger networks, so we avoid
+    # the per-instance __dict__ and only reserve space for our attributes.
+    __slots__ = ("name", "parents", "children")
     
     def __init__(self, name: str):
         self.name = name
@@ -128,10 +131,11 @@ class Node:
             In order for the access in dictionaries via the name to work, a
             random node is equal to its name as well.
         """
-        try:
+        if other is self:
+            return True
+        if isinstance(other, Node):
             return other.name == self.name
-        except AttributeError:
-            return other == self.name
+        return other == self.name
         
     def __ne__(self, other: Node) -> bool:
         """
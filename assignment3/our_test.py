@@ -58,6 +58,16 @@ class TestAssignment3(unittest.TestCase):
         self.assertEqual(set(collider), {"A"}, "Incorrect collider found.")
 
 
+    def test_motif_census(self):
+        graph = self._create_lecture_graph()
+        census = solution.motif_census(graph)
+        self.assertEqual(census["forks"], solution.find_forks(graph))
+        self.assertEqual(census["chains"], solution.find_chains(graph))
+        self.assertEqual(census["colliders"], solution.find_collider(graph))
+        self.assertEqual(census["immoralities"], solution.find_immoralities(graph))
+        indices = solution.motif_census(graph, return_indices=True)
+        self.assertEqual(indices["immoralities"].shape, (3, 3))
+
     def test_find_immoralities(self):
         graph1 = self._create_example_graph()
         graph2 = graph1.copy()
@@ -102,6 +112,19 @@ class TestAssignment3(unittest.TestCase):
         graph2.add_edge("R","E")
         self.assertTrue(solution.markov_equivalent(graph1, graph2), "Graphs are ME")
 
+    def test_cpdag(self):
+        graph1 = self._create_example_graph()
+        graph2 = graph1.copy()
+        graph2.remove_edge("E","R")
+        graph2.add_edge("R","E")
+        graph3 = graph1.copy()
+        graph3.remove_edge("B","A")
+        graph3.add_edge("A","B")
+        nodes, directed, undirected = solution.get_cpdag(graph1)
+        self.assertEqual(directed, {("B", "A"), ("E", "A")}, "Only the immorality is compelled")
+        self.assertEqual(undirected, {frozenset(("E", "R"))})
+        self.assertEqual(solution.group_markov_equivalent([graph1, graph3, graph2]), [[0, 2], [1]])
+
     def test_get_paths(self):
         graph = self._create_example_graph()
         paths = solution.get_paths(graph, "A", "R")
@@ -109,6 +132,20 @@ class TestAssignment3(unittest.TestCase):
         for p in true_paths:
             self.assertIn(p, paths)
 
+    def test_iter_paths_bounded(self):
+        graph = self._create_lecture_graph()
+        all_paths = solution.get_paths(graph, "A", "I")
+        self.assertIn(["A", "C", "E", "H", "F", "I"], all_paths)
+        self.assertIn(["A", "C", "E", "H", "M", "I"], all_paths)
+        self.assertEqual(solution.get_paths(graph, "A", "I", max_length=4), [])
+        self.assertEqual(len(list(solution.iter_paths(graph, "A", "I", max_count=1))), 1)
+        # The length limit also holds for direct edges
+        graph = self._create_example_graph()
+        self.assertEqual(solution.get_paths(graph, "A", "E", max_length=0), [])
+        self.assertEqual(solution.get_paths(graph, "A", "E", max_length=1), [["A", "E"]])
+        self.assertEqual(solution.get_paths(graph, "A", "R", max_length=1), [])
+        self.assertEqual(solution.get_paths(graph, "A", "A", max_length=0), [["A"]])
+
     def test_is_collider(self):
         graph = self._create_example_graph()
         path = ["B","A","E"]
@@ -129,6 +166,54 @@ class TestAssignment3(unittest.TestCase):
         self.assertTrue(solution.check_independence(graph, ["B"], ["E"], ["R"]), "B and E are conditionally indepedent given E")
         self.assertFalse(solution.check_independence(graph, ["B"], ["E"], ["A"]), "B and E are conditionally dependent given A")
 
+    def test_check_independence_sets(self):
+        graph = self._create_lecture_graph()
+        self.assertTrue(solution.check_independence(graph, ["A", "C"], ["B", "D"], []), "H is a closed collider")
+        self.assertFalse(solution.check_independence(graph, ["A", "C"], ["B", "D"], ["L"]), "Observing L opens the collider H")
+        self.assertTrue(solution.check_independence(graph, ["A"], ["B", "I"], ["L", "F", "M"]), "F and M block all open trails")
+        self.assertEqual(solution.get_reachable_nodes(graph, ["G"], ["E"]), {"G"})
+
+    def test_independence_oracle(self):
+        graph = self._create_lecture_graph()
+        oracle = solution.IndependenceOracle(graph)
+        queries = [(["A"], ["B"], ["C"]), (["A"], ["B"], ["L"]), (["A"], ["I"], ["L", "F"]), (["A"], ["E"], ["C"])]
+        expected = [solution.check_independence(graph, *q) for q in queries]
+        self.assertEqual(oracle.check_batch(queries), expected)
+        self.assertIs(oracle.get_ancestral_closure(["F", "L"]), oracle.get_ancestral_closure(["L", "F"]))
+        self.assertEqual(oracle.reachable(["G"], ["E"]), {"G"})
+
+    def test_find_minimal_separator(self):
+        graph = self._create_lecture_graph()
+        self.assertEqual(solution.find_minimal_separator(graph, ["A"], ["G"]), {"C"})
+        self.assertEqual(solution.find_minimal_separator(graph, ["A", "B"], ["L"]), {"H"})
+        separator = solution.find_minimal_separator(graph, ["A", "B"], ["L"], restricted_to=["C", "D", "E", "F", "M"])
+        self.assertEqual(separator, {"C", "D"})
+        self.assertTrue(solution.check_independence(graph, ["A", "B"], ["L"], separator))
+        self.assertEqual(solution.find_minimal_separator(graph, ["A"], ["G"], restricted_to=["E"]), {"E"})
+        self.assertIsNone(solution.find_minimal_separator(graph, ["A"], ["C"]), "Adjacent nodes can not be separated")
+
+    def test_dynamic_independence_oracle(self):
+        graph = self._create_lecture_graph()
+        oracle = solution.DynamicIndependenceOracle(graph)
+        query = oracle.register_query(["A"], ["B"], ["L"])
+        other = oracle.register_query(["G"], ["C"], ["E"])
+        self.assertFalse(oracle.answer(query), "L opens the collider H")
+        self.assertTrue(oracle.answer(other))
+        self.assertEqual(graph.copy()._observers, [], "Copies must not keep the observers")
+        # States pickled before observers existed can still be restored
+        old = Graph.__new__(Graph)
+        old.__setstate__({"nodes": {}})
+        self.assertEqual(old._observers, [])
+        graph.remove_edge("H", "L")
+        self.assertTrue(oracle.answer(query), "L is no longer a descendant of H")
+        graph.add_edge("G", "I")
+        self.assertEqual(oracle.answers(), {query: True, other: True})
+        graph.add_edge("H", "L")
+        self.assertFalse(oracle.answer(query))
+        oracle.close()
+        graph.remove_edge("H", "L")
+        self.assertFalse(oracle.answer(query), "The closed oracle no longer follows the graph")
+
     def test_ancestral_graph(self):
         graph = self._create_lecture_graph()
         query_nodes = ["A","I","F","L"]
@@ -145,6 +230,21 @@ class TestAssignment3(unittest.TestCase):
         self.assertFalse(moral_graph.is_directed, "The moral graph should no longer be directed.")
         self.assertEqual(set(graph.nodes.keys()), set(moral_graph.nodes.keys()), "A moral graph should not lose any nodes")
 
+    def test_get_connected_nodes(self):
+        graph = self._create_lecture_graph()
+        self.assertEqual(solution.get_connected_nodes(graph, ["A", "G"], ["C", "E"]), {"A", "G"})
+        self.assertTrue(solution.check_independence_general(graph, ["A", "G"], ["B", "H"], ["C", "E"]))
+        self.assertFalse(solution.check_independence_general(graph, ["A", "G"], ["B", "H"], ["C"]), "G-E-H avoids C")
+
+    def test_moral_ancestral_view(self):
+        graph = self._create_lecture_graph()
+        view = solution.make_moral_view(solution.make_ancestral_view(graph, ["A", "I", "F", "L"]))
+        self.assertFalse("G" in view.nodes, "G is not part of the ancestral graph")
+        self.assertIn("M", view.get_neighbours("F"), "F and M are married through their child H")
+        self.assertIs(view.nodes["H"], graph.nodes["H"], "Views must not copy nodes")
+        self.assertTrue(solution.check_independence_general(graph, ["A"], ["B"], ["M"], moralize=True), "H is not ancestral to A, B or M")
+        self.assertFalse(solution.check_independence_general(graph, ["A"], ["I"], ["L", "F"], moralize=True))
+
     def test_separation(self):
         graph = self._create_lecture_graph()
         moral_graph = graph
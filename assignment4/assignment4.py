@@ -20,12 +20,13 @@ Skeleton file for exact inference.
     just as you have seen in the previous assignments.
 """
 
-from copy import copy
-from typing import Union, Optional, List, Dict, Iterable, Tuple
+import weakref
+from typing import Union, Optional, List, Dict, Iterable, Tuple, Callable, Set
 
 from ccbase.networks import BayesianNetwork, Graph
 from ccbase.nodes import DiscreteVariable, Node
 from ccbase.factor import Factor
+from ccbase import elimination, trace
 import numpy as np
 from math import inf
 
@@ -36,16 +37,26 @@ from math import inf
 #      #
 ########
 
-def get_elimination_ordering(bn: BayesianNetwork) -> List[str]:
+def get_elimination_ordering(bn: BayesianNetwork, heuristic: Union[str, Callable] = "min_fill",
+                                restarts: int = 0, seed: Optional[int] = None) -> List[str]:
     """
         Computes an elimination order of all the variables in the network
-        according to the MinFillOrder heuristic.
+        according to the MinFillOrder heuristic, or any other heuristic
+        from ccbase.elimination.
 
         Parameters
         ---------
         bn: BayesianNetwork
             The BayesianNetwork for which the elimination order is to be 
             computed.
+        heuristic: String or callable, optional
+            The name of a heuristic in ccbase.elimination.HEURISTICS or a
+            custom scoring function. Defaults to min_fill.
+        restarts: int, optional
+            The number of additional runs with random tie-breaking, the order
+            with the smallest largest factor is used.
+        seed: int, optional
+            Seed for the random tie-breaking.
         
         Returns
         -------
@@ -57,65 +68,10 @@ def get_elimination_ordering(bn: BayesianNetwork) -> List[str]:
             Exercise 1 Task 2 does not require you to write code, instead
             you should describe another heuristic and explain how it works
             and what the differences are with respect to the MinFillOrder.
+            The weighted min-fill heuristic described in Weighted-Min-Fill.txt
+            is available as heuristic="weighted_min_fill".
     """
-    def compute_neighbors_edge(g: Graph, node: Union[str,Node])-> int:
-        parents: list = g.get_parents(node)
-        edge_number: int = 0
-
-        ext_neighbor: Node
-        for ext_neighbor in parents:
-            
-            int_neighbor: Node
-            for int_neighbor in parents:
-                if (ext_neighbor != int_neighbor) and (int_neighbor not in ext_neighbor.parents):
-                    
-                    edge_number += 1
-                    g.add_edge(int_neighbor,ext_neighbor)
-                    g.add_edge(ext_neighbor,int_neighbor)
-        
-        g.remove_node(node)
-        return edge_number, g
-
-    graph: Graph = Graph()
-    graph.nodes = copy(bn.nodes)
-    elimination_order: list = []
-
-    graph = graph.to_undirected()
-
-    
-    # for index in range(0,len(graph.nodes)):
-    while (True):
-        """These variables are used to updating the local min"""
-        node_to_remove: str = ""
-        min_adding_edge: int = inf
-        """Making a copy of the working graph so we can physically adding the edges and removing the node"""
-        working_graph = graph.copy()
-        tmp_added_edges_graph = Graph()
-        
-        for node in graph.nodes:
-            
-            if node not in elimination_order:
-                """Computing the number of edges that should be added to the node neighborhood"""
-                (edge_that_should_be_added, editedGraph) = compute_neighbors_edge(working_graph.copy(), node)
-                
-                """Updating local min edge counter and node name that should be removed"""
-                if edge_that_should_be_added < min_adding_edge:
-                    node_to_remove = node
-                    min_adding_edge = edge_that_should_be_added
-                    tmp_added_edges_graph = editedGraph
-
-        """
-            When the node that should be removed is computed we can add it to te list
-            And updated the working graph with the edges added in the node 
-            neighborhood and that node removed
-        """
-        elimination_order.append(node_to_remove)
-        working_graph = tmp_added_edges_graph
-        
-        if len(elimination_order) == len(graph.nodes):
-            break    
-
-    return elimination_order
+    return elimination.get_elimination_ordering(bn, heuristic, restarts, seed)
         
 
 
@@ -194,17 +150,155 @@ def sum_product_elim_var(factors: Iterable[Factor], variable: str) -> List[Facto
     return remaining_factors
 
 
+def get_relevant_variables(bn: BayesianNetwork, variables: Iterable[str],
+                            evidence: Optional[Iterable[str]] = None) -> Set[str]:
+    """
+        Computes the variables that are relevant for a query, i.e. the query
+        and evidence variables together with all their ancestors. All other
+        variables are barren and sum out to 1.
+
+        Parameters
+        ----------
+        bn: BayesianNetwork
+        variables: [Nodename]
+            The names of the query variables.
+        evidence: iterable of Nodename, optional
+            The names of the evidence variables.
+
+        Returns
+        -------
+        set
+            The names of all relevant variables.
+    """
+    relevant = set(variables) | set(evidence or ())
+    stack = list(relevant)
+    while stack:
+        for p in bn.nodes[stack.pop()].parents:
+            if p not in relevant:
+                relevant.add(p)
+                stack.append(p)
+    return relevant
+
+def condition_factor(factor: Factor, evidence: Dict[str, str]) -> Factor:
+    """
+        Instantiates the evidence variables in the given factor. In contrast to
+        Factor.reduce, the evidence variables are removed from the factor,
+        so that it only keeps the entries that are consistent with the evidence.
+
+        Parameters
+        ----------
+        factor: ccbase.factor.Factor
+            The factor to condition.
+        evidence: dict
+            A dictionary containing variable:outcome pairs.
+
+        Returns
+        -------
+        ccbase.factor.Factor
+            A new factor over the non-evidence variables of factor.
+    """
+    index = []
+    for v in factor.variable_order:
+        if v in evidence:
+            try:
+                index.append(factor.outcomes[v].index(evidence[v]))
+            except ValueError:
+                raise ValueError("There is no potential for variable {} " \
+                                 "with outcome {} in this factor.".format(v, evidence[v]))
+        else:
+            index.append(slice(None))
+    variables = [v for v in factor.variable_order if v not in evidence]
+    return Factor(variables, {v: factor.outcomes[v] for v in variables},
+                    factor.potentials[tuple(index)])
+
+class QueryPlanner:
+    """
+        Plans the variable elimination for queries P(variables|evidence).
+
+        Only the variables relevant to a query are eliminated (see
+        get_relevant_variables), using an elimination order for the moral
+        graph of the relevant subnetwork in which the evidence variables have
+        already been instantiated. The plans are cached per network and
+        (query scope, evidence scope) signature. The cache of a network is
+        dropped as soon as its structure version changes, i.e. when nodes or
+        edges are added or removed, and does not keep the network alive.
+    """
+
+    def __init__(self, heuristic: Union[str, Callable] = "min_fill", restarts: int = 0,
+                    seed: Optional[int] = None):
+        """
+            Parameters
+            ----------
+            heuristic: String or callable, optional
+                The elimination heuristic, see ccbase.elimination.
+            restarts: int, optional
+                The number of additional randomized runs of the heuristic.
+            seed: int, optional
+                Seed for the randomized runs.
+        """
+        self.heuristic = heuristic
+        self.restarts = restarts
+        self.seed = seed
+        self._plans = weakref.WeakKeyDictionary()
+
+    def plan(self, bn: BayesianNetwork, variables: Iterable[str],
+                evidence: Optional[Iterable[str]] = None) -> Tuple[Set[str], List[str]]:
+        """
+            Returns the plan for the query P(variables|evidence).
+
+            Parameters
+            ----------
+            bn: BayesianNetwork
+            variables: [Nodename]
+                The names of the query variables.
+            evidence: iterable of Nodename, optional
+                The names of the evidence variables, their outcomes do not
+                matter for the plan.
+
+            Returns
+            -------
+            set
+                The names of the relevant variables whose factors are needed.
+            [str]
+                The variables to eliminate in elimination order.
+        """
+        variables = frozenset(variables)
+        evidence = frozenset(evidence or ())
+        cached_version, plans = self._plans.get(bn, (None, None))
+        if cached_version != bn.structure_version:
+            plans = {}
+            self._plans[bn] = (bn.structure_version, plans)
+
+        signature = (variables, evidence)
+        if signature not in plans:
+            relevant = get_relevant_variables(bn, variables, evidence)
+            # Evidence variables are instantiated in the factors, unless they
+            # are queried themselves
+            instantiated = evidence - variables
+            order = elimination.get_constrained_ordering(bn, relevant - variables - instantiated,
+                                                            relevant, instantiated, self.heuristic,
+                                                            self.restarts, self.seed)
+            plans[signature] = (relevant, order)
+        return plans[signature]
+
+    def clear_cache(self):
+        """
+            Removes all cached plans.
+        """
+        self._plans.clear()
+
+_default_planner = QueryPlanner()
+
 def calculate_probabilities(bn: BayesianNetwork,
                             variables: List[str],
-                            evidence: Optional[dict] = None) -> Factor:
+                            evidence: Optional[dict] = None,
+                            planner: Optional[QueryPlanner] = None) -> Factor:
     """
-    CHECK IF 
-        query and calculate prior marginals for every variable in the network
-        query and calculate posteriors given evidence observed for one or more other nodes (evidence can be empty)
-        
         Calculates P(variables|evidence) for all outcome combinations of
         variables (i.e. you should return a table similar to a cpt,
         only representing a joint distribution in this case.)
+        This covers the prior marginals of any variable (evidence can be
+        empty) as well as posteriors given evidence for one or more other nodes.
         
         Example: Calling calculate_marginals(["rain", "winter"], 
                                                 {"sprinkler":"True"})
@@ -223,38 +317,55 @@ def calculate_probabilities(bn: BayesianNetwork,
             A dictionary containing the evidence variables as keys and their
             observed outcomes as values. If evidence is not given, the prior
             marginals should be computed.
+        planner: QueryPlanner, optional
+            The planner providing the elimination order. A shared planner
+            with the min-fill heuristic is used by default.
             
         Returns
         -------
         ccbase.factor.Factor
-            A Factor over the specified variables, specifying the joint (posterior) probability
-            of these variables.
-    """
-
-    result_factor = Factor()
-
-    # Generate a list of all the Factors in the given Bayesian Network
-    factors = [Factor.from_node(node) for node in bn.nodes.values()]
+            A Factor over the specified variables (in the given order), 
+            specifying the joint (posterior) probability of these variables.
 
-    # Get the elimination ordering for this Bayesian Network and use it for an improved efficiency
-    elimination_ordering = get_elimination_ordering(bn)
-    # print("ELEM ORDER ",elimination_ordering)
-    # Apply the Sum-Product Algorithm as described in Darwiche, 2009 p. 134
+        Raises
+        ------
+        ValueError
+            If the evidence has probability 0.
+    """
+    variables = [bn.nodes[v].name for v in variables]
+    evidence = {bn.nodes[v].name: outcome for v, outcome in (evidence or {}).items()}
+    relevant, elimination_ordering = (planner or _default_planner).plan(bn, variables, evidence)
+
+    # Apply the evidence first, so that the factors are as small as possible.
+    # Queried evidence variables need to stay in the factors and are only reduced.
+    instantiated = {v: outcome for v, outcome in evidence.items() if v not in variables}
+    factors = []
+    for name in (name for name in bn.nodes if name in relevant):
+        factor = condition_factor(Factor.from_node(bn.nodes[name]), instantiated)
+        if evidence.keys() - instantiated.keys():
+            factor = factor.reduce(evidence)
+        factors.append(factor)
+
+    # Apply the Sum-Product Algorithm as described in Darwiche, 2009 p. 134,
+    # but only for the relevant variables we are _not_ interested in
     for variable in elimination_ordering:
-        # Eliminate only the variables we are _not_ interested in
-        if variable not in variables:
-            # Inner step of the algorithm using sum_product_elim_var
+        with trace.step("sum", variable, factors):
             factors = sum_product_elim_var(factors, variable)
-    # print("factors summed:",[fact.potentials for fact in factors])
+
     # Calculate the final product of all the remaining factors
+    result_factor = Factor()
     for factor in factors:
         result_factor = result_factor.multiply(factor)
-    # print("factors multiply",result_factor.potentials)
-    # Return the reduced factor using the given evidence
+    result_factor.potentials = np.transpose(result_factor.potentials, 
+                                            [result_factor.variable_order.index(v) for v in variables])
+    result_factor.variable_order = list(variables)
+
     if evidence:
-        result_factor = result_factor.reduce(evidence)
-    
-    # print("factors",result_factor.potentials)
+        # Normalizing by P(evidence) to obtain the posterior
+        p_evidence = np.sum(result_factor.potentials)
+        if p_evidence == 0:
+            raise ValueError("The evidence {} is impossible, i.e. has probability 0.".format(evidence))
+        result_factor.potentials = result_factor.potentials / p_evidence
 
     return result_factor
 
@@ -418,7 +529,9 @@ def calculate_MAP(bn: BayesianNetwork,
 
     #eliminate via max_out
     for variable in elimination_ordering:
-        maxed_factors , combined_factor =max_product_elim_var(factors_listed,variable) #elimintate var fom factors
+        with trace.step("max", variable, factors_listed) as step:
+            maxed_factors , combined_factor =max_product_elim_var(factors_listed,variable) #elimintate var fom factors
+            step.set_result(maxed_factors[-1]) #maximize_out is not traced itself
         if combined_factor not in joint_factors: #check if combined_factor already listed
             joint_factors[variable]=combined_factor #if not add to list
 
@@ -437,7 +550,418 @@ def calculate_MAP(bn: BayesianNetwork,
     return mpe,max_inst 
     
 
+def eliminate_variables(factors: Iterable[Factor], order: List[str],
+                        maximized: Optional[Set[str]] = None) -> float:
+    """
+        Eliminates all variables from the given factors in the given order,
+        maximizing out the variables in maximized and summing out all others.
+
+        Parameters
+        ----------
+        factors: iterable of ccbase.factor.Factor
+            The factors, which must not contain variables that are missing in order.
+        order: list of String
+            The elimination order.
+        maximized: set of String, optional
+            The variables that are eliminated via maximization.
+
+        Returns
+        -------
+        float
+            The product of the remaining (empty) factors.
+    """
+    factors = list(factors)
+    for variable in order:
+        if maximized and variable in maximized:
+            factors, _ = max_product_elim_var(factors, variable)
+        else:
+            factors = sum_product_elim_var(factors, variable)
+    value = 1.0
+    for factor in factors:
+        value *= float(factor.potentials)
+    return value
+
+def _marginal_map_branch_and_bound(factors: List[Factor], map_order: List[str],
+                                    sum_order: List[str], bound_order: List[str],
+                                    outcomes: Dict[str, Tuple[str]]) -> Tuple[float, Dict[str, str]]:
+    """
+        Depth first branch and bound search over the MAP variables. Partial
+        assignments are bounded by eliminating the remaining variables in an
+        unconstrained order, which can only overestimate the value since
+        sum_S max_Q f >= max_Q sum_S f.
+    """
+    best = [-inf, None]
+
+    def _search(assignment):
+        variable = map_order[len(assignment)]
+        is_last = len(assignment) + 1 == len(map_order)
+        children = []
+        for outcome in outcomes[variable]:
+            child = dict(assignment)
+            child[variable] = outcome
+            conditioned = [condition_factor(f, child) for f in factors]
+            if is_last:
+                # All MAP variables are assigned, so that the value is exact
+                value = eliminate_variables(conditioned, sum_order)
+                if value > best[0]:
+                    best[0], best[1] = value, child
+            else:
+                remaining = set(map_order[len(child):])
+                bound = eliminate_variables(conditioned, [v for v in bound_order if v not in child],
+                                            remaining)
+                children.append((bound, outcome, child))
+        # Most promising children first, the rest might get pruned afterwards
+        for bound, _, child in sorted(children, key=lambda c: c[0], reverse=True):
+            if bound <= best[0]:
+                break
+            _search(child)
+
+    if map_order:
+        _search({})
+    else:
+        best[0], best[1] = eliminate_variables(factors, sum_order), {}
+    return best[0], best[1]
+
+def calculate_marginal_MAP(bn: BayesianNetwork, variables: List[str],
+                            evidence: Optional[Dict[str, str]] = None,
+                            branch_and_bound: bool = False) -> Tuple[float, Dict[str,str]]:
+    """
+        Function calculating the marginal MAP, i.e. the most probable 
+        instantiation of the given variables with all other variables summed out.
+
+        By default, constrained variable elimination is used, which first sums
+        out all other variables and then maximizes over the MAP variables.
+        As this constrained order can have a much larger width than an
+        unconstrained one, a branch and bound search over the MAP variables
+        can be used instead, which only requires unconstrained eliminations.
+
+        Parameters
+        -----------
+        bn: ccbase.networks.BayesianNetwork
+            The BayesianNetwork for which the marginal MAP is to be computed.
+        variables: [Node/Nodename]
+            The MAP variables.
+        evidence: {Node/Nodename: Outcome}, optional
+            The evidence which needs to be considered when computing the MAP.
+        branch_and_bound: bool, optional
+            Whether to use branch and bound search instead of constrained 
+            elimination.
+
+        Returns
+        --------
+        float
+            The joint probability of the marginal MAP and the evidence.
+        dict
+            A dictionary representing the marginal MAP as Variable:Outcome pairs
+            for all given variables.
+    """
+    evidence = {bn.nodes[v].name: outcome for v, outcome in (evidence or {}).items()}
+    # MAP variables that are observed are simply set to their evidence
+    fixed = {bn.nodes[v].name: evidence[bn.nodes[v].name] for v in variables if v in evidence}
+    map_variables = [bn.nodes[v].name for v in variables if bn.nodes[v].name not in evidence]
+
+    relevant = get_relevant_variables(bn, map_variables, evidence)
+    sum_variables = relevant - set(map_variables) - set(evidence)
+    order = elimination.get_constrained_ordering(bn, sum_variables, relevant, evidence,
+                                                    then=map_variables)
+    factors = [condition_factor(Factor.from_node(bn.nodes[name]), evidence)
+                for name in bn.nodes if name in relevant]
+
+    if branch_and_bound:
+        sum_order = order[:len(sum_variables)]
+        bound_order = elimination.get_constrained_ordering(bn, sum_variables | set(map_variables),
+                                                            relevant, evidence)
+        outcomes = {v: bn.nodes[v].outcomes for v in map_variables}
+        value, assignment = _marginal_map_branch_and_bound(factors, order[len(sum_variables):], 
+                                                            sum_order, bound_order, outcomes)
+    else:
+        for variable in order[:len(sum_variables)]:
+            factors = sum_product_elim_var(factors, variable)
+        joint_factors = {}
+        for variable in order[len(sum_variables):]:
+            factors, joint_factors[variable] = max_product_elim_var(factors, variable)
+        value = 1.0
+        for factor in factors:
+            value *= float(factor.potentials)
+        assignment = traceback(joint_factors, order[len(sum_variables):])
+
+    assignment.update(fixed)
+    return value, assignment
+
+
+
+_combine_assignments = np.frompyfunc(lambda a, b: None if a is None or b is None else a + b, 2, 1)
+
+class KBestTable:
+    """
+        A factor that keeps, for every instantiation of its variables, the
+        k largest max-product values of the variables that have already been
+        maximized out, together with the instantiations of those variables
+        that achieve these values.
+
+        The values are stored in an array with one additional last dimension
+        of size k, sorted in descending order, and the instantiations in an
+        object array of the same shape containing tuples of 
+        (variable, outcome) pairs. Unused slots have value 0 and instantiation None.
+    """
+
+    def __init__(self, variables: List[str], outcomes: Dict[str, Tuple[str]],
+                    values: np.array, assignments: np.array):
+        self.variable_order = list(variables)
+        self.outcomes = dict(outcomes)
+        self.values = values
+        self.assignments = assignments
+
+    @classmethod
+    def from_factor(cls, factor: Factor, k: int) -> "KBestTable":
+        """
+            Creates a k-best table from a factor, where every instantiation 
+            has a single entry with an empty instantiation of eliminated variables.
+        """
+        values = np.zeros(factor.potentials.shape + (k,))
+        values[..., 0] = factor.potentials
+        assignments = np.full(values.shape, None, dtype=object)
+        # Empty tuples need to be wrapped, as numpy would otherwise interpret
+        # them as (empty) sequences
+        empty = np.empty((), dtype=object)
+        empty[()] = ()
+        assignments[..., 0] = empty
+        return cls(factor.variable_order, factor.outcomes, values, assignments)
+
+    def _align(self, variables: List[str]) -> Tuple[np.array, np.array]:
+        """
+            Returns the values and instantiations with their dimensions
+            arranged according to the given variables (a superset of this 
+            table's variables), using dimensions of size 1 for missing variables.
+        """
+        permutation = [self.variable_order.index(v) for v in variables if v in self.variable_order]
+        permutation.append(len(self.variable_order))
+        shape = [len(self.outcomes[v]) if v in self.variable_order else 1 for v in variables]
+        shape.append(self.values.shape[-1])
+        return (self.values.transpose(permutation).reshape(shape), 
+                self.assignments.transpose(permutation).reshape(shape))
+
+    def multiply(self, other: "KBestTable") -> "KBestTable":
+        """
+            Multiplies both tables, keeping the k best of the k*k products of
+            entries for every instantiation of the combined variables.
+        """
+        variables = self.variable_order + [v for v in other.variable_order if v not in self.variable_order]
+        outcomes = dict(self.outcomes)
+        outcomes.update(other.outcomes)
+        values_a, assignments_a = self._align(variables)
+        values_b, assignments_b = other._align(variables)
+        k = values_a.shape[-1]
+
+        products = values_a[..., :, np.newaxis] * values_b[..., np.newaxis, :]
+        shape = products.shape[:-2]
+        products = products.reshape(shape + (k * k,))
+        best = np.argsort(-products, axis=-1, kind="stable")[..., :k]
+        values = np.take_along_axis(products, best, -1)
+        # Only the selected entries are combined
+        assignments = _combine_assignments(np.take_along_axis(np.broadcast_to(assignments_a, shape + (k,)), best // k, -1),
+                                            np.take_along_axis(np.broadcast_to(assignments_b, shape + (k,)), best % k, -1))
+        return KBestTable(variables, outcomes, values, assignments)
+
+    def maximize_out(self, variable: str) -> "KBestTable":
+        """
+            Removes the given variable, keeping the k best entries out of the
+            entries for all its outcomes and recording the chosen outcome.
+        """
+        axis = self.variable_order.index(variable)
+        num_outcomes = len(self.outcomes[variable])
+        k = self.values.shape[-1]
+        values = np.moveaxis(self.values, axis, -2)
+        assignments = np.moveaxis(self.assignments, axis, -2)
+        shape = values.shape[:-2]
+        values = values.reshape(shape + (num_outcomes * k,))
+        assignments = assignments.reshape(shape + (num_outcomes * k,))
+
+        best = np.argsort(-values, axis=-1, kind="stable")[..., :k]
+        labels = np.empty(num_outcomes, dtype=object)
+        for i, outcome in enumerate(self.outcomes[variable]):
+            labels[i] = ((variable, outcome),)
+        chosen = labels[best // k]
+        variables = [v for v in self.variable_order if v != variable]
+        outcomes = {v: self.outcomes[v] for v in variables}
+        return KBestTable(variables, outcomes, np.take_along_axis(values, best, -1),
+                            _combine_assignments(np.take_along_axis(assignments, best, -1), chosen))
+
+def calculate_top_k_MPE(bn: BayesianNetwork, k: int,
+                        evidence: Optional[Dict[str, str]] = None) -> List[Tuple[float, Dict[str, str]]]:
+    """
+        Computes the k most probable explanations, i.e. the k most probable
+        instantiations of all variables given the evidence.
+
+        Max-product elimination is performed on KBestTables, which keep the k
+        best partial explanations in every cell instead of only the best one, 
+        so that all k explanations are obtained with a single elimination.
+
+        Parameters
+        -----------
+        bn: ccbase.networks.BayesianNetwork
+            The BayesianNetwork for which the explanations are to be computed.
+        k: int
+            The number of explanations.
+        evidence: {Node/Nodename: Outcome}, optional
+            The evidence which needs to be considered.
+
+        Returns
+        --------
+        list
+            Up to k (probability, explanation) pairs in descending order of 
+            probability, where the probability is the joint probability of the
+            explanation (including the evidence) and the explanation is a 
+            dictionary of Variable:Outcome pairs for all variables. Explanations
+            with probability 0 are omitted.
+    """
+    evidence = {bn.nodes[v].name: outcome for v, outcome in (evidence or {}).items()}
+    order = elimination.get_constrained_ordering(bn, [v for v in bn.nodes if v not in evidence],
+                                                    instantiated=evidence)
+    tables = [KBestTable.from_factor(condition_factor(Factor.from_node(node), evidence), k)
+                for node in bn.nodes.values()]
+
+    for variable in order:
+        bucket = [t for t in tables if variable in t.variable_order]
+        tables = [t for t in tables if variable not in t.variable_order]
+        product = bucket[0]
+        for table in bucket[1:]:
+            product = product.multiply(table)
+        tables.append(product.maximize_out(variable))
+
+    result = tables[0]
+    for table in tables[1:]:
+        result = result.multiply(table)
+
+    explanations = []
+    for value, assignment in zip(result.values, result.assignments):
+        if assignment is not None and value > 0:
+            explanation = dict(assignment)
+            explanation.update(evidence)
+            explanations.append((float(value), explanation))
+    return explanations
+
+def _reduce_out(factor: Factor, variable: str, reduction: Callable) -> Factor:
+    """
+        Removes the variable from the factor using the given numpy reduction,
+        e.g. np.sum, np.max or np.min, without modifying the factor.
+    """
+    variables = [v for v in factor.variable_order if v != variable]
+    return Factor(variables, {v: factor.outcomes[v] for v in variables},
+                    reduction(factor.potentials, axis=factor.variable_order.index(variable)))
+
+def _partition_bucket(bucket: List[Factor], i_bound: int) -> List[List[Factor]]:
+    """
+        Greedily splits the factors of a bucket into mini-buckets whose 
+        combined scopes contain at most i_bound variables, starting with
+        the largest factors. Factors that are larger on their own get their 
+        own mini-bucket.
+    """
+    mini_buckets = []
+    for factor in sorted(bucket, key=lambda f: len(f.variable_order), reverse=True):
+        for scope, members in mini_buckets:
+            if len(scope.union(factor.variable_order)) <= i_bound:
+                scope.update(factor.variable_order)
+                members.append(factor)
+                break
+        else:
+            mini_buckets.append((set(factor.variable_order), [factor]))
+    return [members for _, members in mini_buckets]
+
+def _mini_bucket_pass(factors: List[Factor], order: List[str], i_bound: int, 
+                        first: Callable, others: Callable) -> Tuple[float, Dict[str, List[Factor]]]:
+    """
+        Performs mini-bucket elimination, eliminating the variable from the
+        first mini-bucket of every bucket with the reduction first and from
+        all other mini-buckets with the reduction others.
+
+        Returns
+        -------
+        float
+            The product of the remaining (empty) factors.
+        dict
+            The factors in the bucket of every variable, used for decoding.
+    """
+    buckets = {}
+    for variable in order:
+        buckets[variable] = [f for f in factors if variable in f.variable_order]
+        factors = [f for f in factors if variable not in f.variable_order]
+        for j, members in enumerate(_partition_bucket(buckets[variable], i_bound)):
+            product = Factor()
+            for factor in members:
+                product = product * factor
+            factors.append(_reduce_out(product, variable, first if j == 0 else others))
+    value = 1.0
+    for factor in factors:
+        value *= float(factor.potentials)
+    return value, buckets
+
+def calculate_mini_bucket_bounds(bn: BayesianNetwork, i_bound: int, 
+                                    evidence: Optional[Dict[str, str]] = None,
+                                    mpe: bool = False) -> Tuple[float, float]:
+    """
+        Computes lower and upper bounds on the probability of the evidence
+        P(evidence), or on the probability of the MPE, using mini-bucket 
+        elimination.
+
+        Every bucket is split into mini-buckets with at most i_bound variables,
+        which are eliminated separately, so that no created factor has more
+        than i_bound - 1 variables (unless a single CPT is already larger). 
+        Larger i-bounds give tighter bounds at higher costs, and the bounds
+        are exact once i_bound exceeds the induced width of the elimination order.
+
+        For P(evidence), the upper (lower) bound sums out the variable from
+        one mini-bucket and maximizes (minimizes) it out from all others.
+        For the MPE, the upper bound maximizes out the variable from all
+        mini-buckets, while the lower bound is the probability of the
+        explanation decoded from the mini-bucket factors.
 
+        Parameters
+        -----------
+        bn: ccbase.networks.BayesianNetwork
+            The BayesianNetwork for which the bounds are computed.
+        i_bound: int
+            The maximum number of variables in a mini-bucket.
+        evidence: {Node/Nodename: Outcome}, optional
+            The evidence which needs to be considered.
+        mpe: bool, optional
+            Whether to bound the probability of the MPE instead of P(evidence).
+
+        Returns
+        --------
+        float
+            The lower bound.
+        float
+            The upper bound.
+    """
+    evidence = {bn.nodes[v].name: outcome for v, outcome in (evidence or {}).items()}
+    # Barren variables do not affect P(evidence), but they are part of the MPE
+    if mpe:
+        nodes = set(bn.nodes)
+    else:
+        nodes = get_relevant_variables(bn, [], evidence)
+    order = elimination.get_constrained_ordering(bn, nodes - set(evidence), nodes, evidence)
+    factors = [condition_factor(Factor.from_node(bn.nodes[name]), evidence)
+                for name in bn.nodes if name in nodes]
+
+    if not mpe:
+        upper, _ = _mini_bucket_pass(factors, order, i_bound, np.sum, np.max)
+        lower, _ = _mini_bucket_pass(factors, order, i_bound, np.sum, np.min)
+        return lower, upper
+
+    upper, buckets = _mini_bucket_pass(factors, order, i_bound, np.max, np.max)
+    # Decoding in reverse order, every bucket only contains variables that
+    # are already assigned apart from its own variable
+    assignment = dict(evidence)
+    for variable in reversed(order):
+        product = Factor()
+        for factor in buckets[variable]:
+            product = product * condition_factor(factor, assignment)
+        assignment[variable] = product.outcomes[variable][int(np.argmax(product.potentials))]
+    lower = 1.0
+    for factor in factors:
+        lower *= float(condition_factor(factor, assignment).potentials)
+    return lower, upper
 
 ######
 #
@@ -11,6 +11,7 @@ from __future__ import annotations
 import numpy as np
 from typing import Union, Optional, List, Dict, Iterable
 from .nodes import DiscreteVariable
+from . import trace
 
 class Factor(object):
     
@@ -182,6 +183,8 @@ class Factor(object):
         #result in returning a matrix for the remaining variables
         return np.squeeze(np.copy(self.potentials[np.ix_(*index)]))
         
+    # Summing out needs one addition per entry of this factor
+    @trace.traced("marginalize", lambda self, res: self.potentials.size)
     def marginalize(self, variables: List[str]) -> Factor:
         """
             Creates a new factor where the specified variables are summed out.
@@ -212,6 +215,8 @@ class Factor(object):
             
         return res
 
+    # One multiplication per entry of the resulting factor
+    @trace.traced("multiply", lambda self, res: res.potentials.size)
     def multiply(self, other_factor: Factor) -> Factor:
         """
             Creates a new factor, which is the resulting product of multiplying
@@ -307,6 +312,8 @@ class Factor(object):
         """
         return self.multiply(other)
 
+    # The evidence mask is multiplied with every entry of this factor
+    @trace.traced("reduce", lambda self, res: self.potentials.size)
     def reduce(self, evidence: Dict[str, str]) -> Factor:
         """
             Creates a new factor which has been reduced to conform to the 
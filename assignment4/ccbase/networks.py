@@ -180,14 +180,14 @@ class Graph:
         """
         if not node in self.nodes:
             raise ValueError("The graph does not contain a node called {}".format(node))
-        def _add_parents(tmpNode):
-            for p in tmpNode.parents.values():
-                if p in res:
-                    continue
-                res.add(p)
-                _add_parents(p)
+        # Iterative traversal, so that deep graphs do not hit the recursion limit
         res = set()
-        _add_parents(self.nodes[node])
+        stack = [self.nodes[node]]
+        while stack:
+            for p in stack.pop().parents.values():
+                if p not in res:
+                    res.add(p)
+                    stack.append(p)
         return res
 
     def is_ancestor(self, node_a: Union[str, Node], node_b: Union[str, Node]) -> bool:
@@ -322,4 +322,39 @@ class BayesianNetwork(Graph):
     def __init__(self):
         #Call the constructor of the Graph class.
         super(BayesianNetwork, self).__init__()
+        # Incremented whenever nodes or edges are added or removed, so that
+        # cached results (e.g. query plans) can be invalidated cheaply
+        self.structure_version = 0
+
+    def add_node(self, node: Union[str, Node]):
+        """
+            Adds a node to the network, see Graph.add_node,
+            and increments the structure version.
+        """
+        super(BayesianNetwork, self).add_node(node)
+        self.structure_version += 1
+
+    def remove_node(self, node: Union[str, Node]):
+        """
+            Removes a node from the network, see Graph.remove_node,
+            and increments the structure version.
+        """
+        super(BayesianNetwork, self).remove_node(node)
+        self.structure_version += 1
+
+    def add_edge(self, node1: Union[str, Node], node2: Union[str, Node]):
+        """
+            Adds an edge to the network, see Graph.add_edge,
+            and increments the structure version.
+        """
+        super(BayesianNetwork, self).add_edge(node1, node2)
+        self.structure_version += 1
+
+    def remove_edge(self, node1: Union[str, Node], node2: Union[str, Node]):
+        """
+            Removes an edge from the network, see Graph.remove_edge,
+            and increments the structure version.
+        """
+        super(BayesianNetwork, self).remove_edge(node1, node2)
+        self.structure_version += 1
         
\ No newline at end of file
@@ -10,7 +10,31 @@ node from before will be used as baseclass for other extensions.
 from __future__ import annotations
 import numpy as np
 
-from typing import Optional, List, Dict, Iterable
+from typing import Optional, List, Dict, Iterable, Tuple
+
+
+# Cache of outcome tuples, so that variables sharing the same domain
+# (e.g. the many binary True/False variables) also share the same tuple.
+_OUTCOME_CACHE: Dict[Tuple, Tuple] = {}
+
+
+def intern_outcomes(outcomes: Iterable[str]) -> Tuple[str, ...]:
+    """
+        Returns the canonical (shared) tuple for the given outcomes.
+
+        Parameters
+        ----------
+        outcomes: iterable of String
+            The outcomes of a discrete variable, in order.
+
+        Returns
+        -------
+        tuple
+            An immutable tuple with the given outcomes. Calling this function
+            twice with the same outcomes returns the identical object.
+    """
+    outcomes = tuple(outcomes)
+    return _OUTCOME_CACHE.setdefault(outcomes, outcomes)
 
 class Node:
     """
@@ -26,6 +50,9 @@ class Node:
             A dictionary containing child-name:Node pairs for children of this node
 
     """
+    # Nodes are created in large numbers for bigger networks, so we avoid
+    # the per-instance __dict__ and only reserve space for our attributes.
+    __slots__ = ("name", "parents", "children")
     
     def __init__(self, name: str):
         self.name = name
@@ -126,10 +153,11 @@ class Node:
             In order for the access in dictionaries via the name to work, a
             random node is equal to its name as well.
         """
-        try:
+        if other is self:
+            return True
+        if isinstance(other, Node):
             return other.name == self.name
-        except AttributeError:
-            return other == self.name
+        return other == self.name
         
     def __ne__(self, other: Node) -> bool:
         """
@@ -144,6 +172,7 @@ class DiscreteVariable(Node):
         The extension of our classical graph node to represent discrete
         variables in Bayesian networks.
     """
+    __slots__ = ("parent_order", "cpt", "outcomes")
 
     def __init__(self, name: str, outcomes: List[str], cpt: Optional[np.array] = None):
         super(DiscreteVariable, self).__init__(name)
@@ -159,7 +188,8 @@ class DiscreteVariable(Node):
             self.cpt = cpt
         else:
             self.cpt = 0
-        self.outcomes = outcomes
+        # Outcomes are stored as (shared) immutable tuples, see intern_outcomes.
+        self.outcomes = intern_outcomes(outcomes)
         
     def add_parent(self, parent_node: DiscreteVariable):
         """
@@ -10,6 +10,7 @@ author: Jan Pöppel
 last modified. 23.11.2021
 """
 
+import json
 import unittest
 import assignment4 as solution
 
@@ -29,6 +30,34 @@ class TestAssignment4(unittest.TestCase):
         return net
 
 
+    def test_discrete_variables_share_outcomes(self):
+        net = self.get_trivial_net()
+        a, b = net.nodes["A"], net.nodes["B"]
+        self.assertIs(a.outcomes, b.outcomes)
+        self.assertFalse(hasattr(a, "__dict__"))
+        self.assertEqual(net.copy().nodes["A"].outcomes, ("True", "False"))
+
+    def test_get_elimination_ordering(self):
+        net = solution.get_simple_net()
+        # Ties are broken by insertion order, after eliminating winter and sprinkler
+        # no fill-in edges are needed anymore.
+        self.assertEqual(solution.get_elimination_ordering(net),
+                            ["winter", "sprinkler", "wet_grass", "rain", "slippery_road"])
+        self.assertEqual(solution.get_elimination_ordering(self.get_trivial_net()), ["A", "B"])
+
+    def test_elimination_heuristics(self):
+        net = solution.get_non_binary_net()
+        for heuristic in solution.elimination.HEURISTICS:
+            order = solution.get_elimination_ordering(net, heuristic, restarts=3, seed=0)
+            self.assertEqual(sorted(order), sorted(net.nodes))
+        # Eliminating john first creates the factor over all three variables
+        self.assertEqual(solution.elimination.get_max_factor_size(net, ["john", "alarm", "burglary"]), 12)
+        # The leaf slippery_road creates the smallest factor in the simple net
+        self.assertEqual(solution.get_elimination_ordering(solution.get_simple_net(), "min_weight")[0],
+                            "slippery_road")
+        with self.assertRaises(ValueError):
+            solution.get_elimination_ordering(net, "max_fill")
+
     def test_initialize_factors(self):
         net = self.get_trivial_net()
         factors = solution.initialize_factors(net, None)
@@ -54,6 +83,26 @@ class TestAssignment4(unittest.TestCase):
         net = self.get_trivial_net()
         res = solution.calculate_probabilities(net, ["A"], {"B":"False"})
         np.testing.assert_almost_equal(res.potentials, np.array([3/10, 7/10]))
+        # Evidence with probability 0 cannot be conditioned on
+        net.nodes["B"].set_probability_table(np.array([1.0, 0.0]))
+        with self.assertRaises(ValueError):
+            solution.calculate_probabilities(net, ["A"], {"B":"False"})
+
+    def test_query_planner(self):
+        net = solution.get_simple_net()
+        planner = solution.QueryPlanner()
+        relevant, order = planner.plan(net, ["rain"], ["sprinkler"])
+        # wet_grass and slippery_road are barren, sprinkler is instantiated
+        self.assertEqual(relevant, {"rain", "sprinkler", "winter"})
+        self.assertEqual(order, ["winter"])
+        self.assertIs(planner.plan(net, ["rain"], ["sprinkler"])[1], order)
+        res = solution.calculate_probabilities(net, ["winter", "rain"], {"sprinkler": "True"}, planner)
+        self.assertEqual(res.variable_order, ["winter", "rain"])
+        np.testing.assert_almost_equal(res.potentials.sum(), 1)
+        # Structural changes invalidate the cached plans
+        net.add_edge("rain", "sprinkler")
+        self.assertEqual(planner.plan(net, ["rain"], ["sprinkler"])[1], ["winter"])
+        self.assertIsNot(planner.plan(net, ["rain"], ["sprinkler"])[1], order)
 
     def test_maximize_out(self):
         f = solution.Factor(["A","B"], {"A":["True","False"], "B": ["True","False"]}, np.array([[0.2,0.3],[0.8,0.7]]))
@@ -80,6 +129,62 @@ class TestAssignment4(unittest.TestCase):
         self.assertEqual(res_prob, 0.42)
         self.assertEqual(res_map, {"A": "False", "B":"False"})
 
+    def test_calculate_marginal_MAP(self):
+        net = solution.get_simple_net()
+        # Unlike in the MPE, winter=True is the most probable on its own
+        self.assertEqual(solution.calculate_MAP(net)[1]["winter"], "False")
+        for branch_and_bound in (False, True):
+            res_prob, res_map = solution.calculate_marginal_MAP(net, ["winter"], None, branch_and_bound)
+            np.testing.assert_almost_equal(res_prob, 0.6)
+            self.assertEqual(res_map, {"winter": "True"})
+            res_prob, res_map = solution.calculate_marginal_MAP(net, ["rain", "sprinkler"], 
+                                                                {"wet_grass": "True"}, branch_and_bound)
+            np.testing.assert_almost_equal(res_prob, 0.3152)
+            self.assertEqual(res_map, {"rain": "True", "sprinkler": "False"})
+
+    def test_calculate_top_k_MPE(self):
+        net = self.get_trivial_net()
+        res = solution.calculate_top_k_MPE(net, 3)
+        np.testing.assert_almost_equal([prob for prob, _ in res], [0.42, 0.32, 0.18])
+        self.assertEqual(res[0][1], {"A": "False", "B":"False"})
+        self.assertEqual(res[1][1], {"A": "False", "B":"True"})
+        # There are only 4 explanations in total
+        self.assertEqual(len(solution.calculate_top_k_MPE(net, 10)), 4)
+        res = solution.calculate_top_k_MPE(solution.get_simple_net(), 2, {"rain": "True"})
+        np.testing.assert_almost_equal([prob for prob, _ in res], [0.21504, 0.09216])
+        self.assertEqual(res[1][1]["slippery_road"], "False")
+
+    def test_calculate_mini_bucket_bounds(self):
+        net = solution.get_simple_net()
+        evidence = {"wet_grass": "True"}
+        p_evidence = solution.calculate_probabilities(net, ["wet_grass"])({"wet_grass": "True"})
+        for i_bound in (1, 2):
+            lower, upper = solution.calculate_mini_bucket_bounds(net, i_bound, evidence)
+            self.assertLessEqual(lower, p_evidence)
+            self.assertGreaterEqual(upper, p_evidence)
+            lower, upper = solution.calculate_mini_bucket_bounds(net, i_bound, mpe=True)
+            self.assertLessEqual(lower, 0.243)
+            self.assertGreaterEqual(upper, 0.243)
+        # The bounds are exact with a large enough i-bound
+        np.testing.assert_almost_equal(solution.calculate_mini_bucket_bounds(net, 3, evidence), 
+                                        [p_evidence, p_evidence])
+        np.testing.assert_almost_equal(solution.calculate_mini_bucket_bounds(net, 3, mpe=True), [0.243, 0.243])
+
+    def test_trace(self):
+        net = solution.get_simple_net()
+        with solution.trace.Tracer("query") as tracer:
+            solution.calculate_probabilities(net, ["wet_grass"])
+        steps = tracer.steps()
+        self.assertEqual([s["variable"] for s in steps], ["winter", "sprinkler", "rain"])
+        self.assertEqual(steps[0]["bucket"], [["winter"], ["sprinkler", "winter"], ["rain", "winter"]])
+        self.assertEqual(steps[0]["result_scope"], ["sprinkler", "rain"])
+        self.assertTrue(all(s["mult_adds"] > 0 and s["bytes"] > 0 for s in steps))
+        self.assertIn("query;sum:winter;multiply ", tracer.flame_summary("mult_adds"))
+        self.assertEqual(len(json.loads(tracer.to_json())["events"]), len(tracer.events))
+        # Nothing is recorded once the tracer is no longer active
+        solution.calculate_probabilities(net, ["wet_grass"])
+        self.assertEqual(len(tracer.steps()), 3)
+
 if __name__ == "__main__":
     unittest.main()
         
\ No newline at end of file
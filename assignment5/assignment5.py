@@ -11,12 +11,16 @@ from typing import Union, Optional, List, Dict, Iterable, Tuple
 
 import numpy as np
 import copy
+import multiprocessing
+import os
 import random
 
 from numpy.core.numeric import base_repr
 
 from ccbase.networks import BayesianNetwork
 from ccbase.nodes import DiscreteVariable
+from ccbase.factor import Factor
+from ccbase import elimination
 
 
 import itertools as it
@@ -72,24 +76,116 @@ def sample(distribution: Dict[str, float]) -> str:
     numpy’s equivalent.
     """
 
-    '''Generating simple sample as saw in the slides by generating a random value and taking the value in that distribution'''
-    keys_number:list = list(distribution.keys())
-    cumulate_list: list = list()
-    cumulate_list.append(0)
+    '''Roulette wheel selection: the outcome whose cumulative interval contains the random value'''
+    outcomes: list = list(distribution.keys())
+    cumulative = np.cumsum(list(distribution.values()))
+    # With side="right" outcomes with probability 0 (empty intervals) are never
+    # chosen, and a random value of exactly 0 selects the first possible outcome
+    index = int(np.searchsorted(cumulative, random.random() * cumulative[-1], side="right"))
+    # Guard against rounding errors at the upper end
+    return outcomes[min(index, len(outcomes) - 1)]
+
+def sample_batch(probs: Iterable[float], n: int, 
+                    rng: Optional[np.random.Generator] = None) -> np.array:
+    """
+        Draws n samples from a single categorical distribution at once,
+        using the cumulative distribution and a binary search per sample.
+        
+        Parameters
+        ----------
+        probs: iterable of float
+            The probabilities of the outcomes, they do not need to be normalized.
+        n: int
+            The number of samples.
+        rng: np.random.Generator, optional
+            The random number generator, a new one is created by default.
+        
+        Returns
+        -------
+        np.array
+            The n sampled outcomes as integer codes, i.e. as indices into probs.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    cumulative = np.cumsum(probs)
+    codes = np.searchsorted(cumulative, rng.random(n) * cumulative[-1], side="right")
+    return np.minimum(codes, len(cumulative) - 1)
 
-    for key_index in range(1,len(keys_number)+1):
-        sub_keys = keys_number[:key_index]
-        cumulate_list.append(sum(
-            [distribution[sub_key] for sub_key in sub_keys]
-        ))
-    
-    probability_generated: float = random.random()
-    
-    for cumulative_index in range(1,len(cumulate_list)):
-        if probability_generated > cumulate_list[cumulative_index-1] and probability_generated <= cumulate_list[cumulative_index]:
-            # return distribution[keys_number[cumulative_index-1]]
-            return keys_number[cumulative_index-1]
-    raise Exception("Unexpected state not found")
+class AliasTable:
+    """
+        Walker alias tables for a set of categorical distributions (e.g. the 
+        rows of a CPT), which allow drawing each sample in constant time
+        from any of the distributions with only two random numbers.
+
+        For every distribution and outcome j, prob[row, j] stores the
+        probability of keeping j, and alias[row, j] the outcome chosen otherwise.
+    """
+
+    def __init__(self, probs: np.array):
+        """
+            Parameters
+            ----------
+            probs: np.array
+                An array of shape (rows, outcomes) containing one (not
+                necessarily normalized) distribution per row.
+        """
+        probs = np.atleast_2d(np.asarray(probs, dtype=float))
+        num_rows, num_outcomes = probs.shape
+        self.num_outcomes = num_outcomes
+        self.prob = np.ones((num_rows, num_outcomes))
+        self.alias = np.tile(np.arange(num_outcomes), (num_rows, 1))
+        # Vose's variant of the alias method for every row
+        for row, distribution in enumerate(probs):
+            scaled = distribution * num_outcomes / distribution.sum()
+            small = [j for j in range(num_outcomes) if scaled[j] < 1]
+            large = [j for j in range(num_outcomes) if scaled[j] >= 1]
+            while small and large:
+                j, l = small.pop(), large.pop()
+                self.prob[row, j] = scaled[j]
+                self.alias[row, j] = l
+                scaled[l] -= 1 - scaled[j]
+                if scaled[l] < 1:
+                    small.append(l)
+                else:
+                    large.append(l)
+            # Remaining entries are 1 up to rounding errors
+
+    @classmethod
+    def from_cpt(cls, cpt: np.array) -> "AliasTable":
+        """
+            Creates the alias tables for all rows of a CPT, whose first 
+            dimension corresponds to the outcomes of the variable. The rows
+            are indexed by the flat (C-order) index of the parent instantiation.
+        """
+        cpt = np.asarray(cpt)
+        return cls(np.moveaxis(cpt, 0, -1).reshape(-1, cpt.shape[0]))
+
+    def sample(self, rows: Union[int, np.array], rng: Optional[np.random.Generator] = None,
+                n: Optional[int] = None) -> np.array:
+        """
+            Draws one sample from the distribution of every given row.
+
+            Parameters
+            ----------
+            rows: int or np.array
+                The row (or array of rows) to sample from.
+            rng: np.random.Generator, optional
+                The random number generator, a new one is created by default.
+            n: int, optional
+                If given, n samples are drawn from the single given row.
+
+            Returns
+            -------
+            np.array
+                The sampled outcomes as integer codes, with the shape of rows
+                or of length n.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        if n is not None:
+            rows = np.full(n, rows)
+        rows = np.asarray(rows)
+        columns = rng.integers(self.num_outcomes, size=rows.shape)
+        keep = rng.random(rows.shape) < self.prob[rows, columns]
+        return np.where(keep, columns, self.alias[rows, columns])
     
 
 
@@ -116,38 +212,8 @@ def get_ancestral_ordering(bayesnet: BayesianNetwork) -> List[str]:
             ancestral ordering (i.e. all parents of a node appear before that
             node in the list)
     """
-    def add_child(root_nodes: list, bn: BayesianNetwork, ancestral_order: dict) -> dict:
-        root_children = {root:list(bayesnet.get_children(root)) for root in root_nodes}
-        for root in root_nodes:
-            actual_children = root_children[root]
-
-            for child in actual_children:
-                for int_child in actual_children:
-                    if int_child != child and bn.is_descendant(int_child,child):
-                        root_children[root].remove(int_child)
-
-            for children in root_children[root]:
-                if str(children) not in ancestral_order.values():
-                    ancestral_order[len(ancestral_order.keys())] = str(children)
-
-        return ancestral_order
-    
-    node_ancestor: dict = dict()
-    ancestral_order:dict = dict()
-    for node in bayesnet.nodes:
-        node_ancestor[node] = list(bayesnet.get_ancestors(node))
-    '''First root node'''
-    root_nodes: list = [node for node in node_ancestor.keys() if len(node_ancestor[node]) == 0]
-    ancestral_order = {index:str(root) for index, root in enumerate(root_nodes)}
-
-    '''Adding direct child of the root'''
-    ancestral_order = add_child(root_nodes, bayesnet, ancestral_order)
-    roots =  list(ancestral_order.values())
-    '''For each node remaining getting his child'''
-    for root in roots:
-        ancestral_order = add_child(bayesnet.get_children(root), bayesnet, ancestral_order)
-
-    return list(ancestral_order.values())
+    # Kahn's algorithm, cached on the network
+    return bayesnet.get_topological_order()
     
     
 ######
@@ -162,7 +228,147 @@ def get_ancestral_ordering(bayesnet: BayesianNetwork) -> List[str]:
 #
 ######
 
-def do_forward_sampling(bayesnet: BayesianNetwork, var_name: str, num_samples: Optional[int]=1000) -> Dict[str, float]:
+def _sample_matrix(bayesnet: BayesianNetwork, num_samples: int, rng: np.random.Generator,
+                    evidence: Dict[str, str]) -> Tuple[np.array, np.array]:
+    """
+        Private helper performing the vectorized forward pass. Evidence
+        columns are clamped to the observed outcome and the log-probabilities
+        of the evidence given the sampled parents are accumulated per sample.
+    """
+    columns = {name: i for i, name in enumerate(bayesnet.nodes)}
+    max_outcomes = max((len(n.outcomes) for n in bayesnet.nodes.values()), default=0)
+    samples = np.zeros((num_samples, len(columns)), dtype=np.int8 if max_outcomes <= 127 else np.int16)
+    log_weights = np.zeros(num_samples)
+
+    for name in get_ancestral_ordering(bayesnet):
+        node: DiscreteVariable = bayesnet.nodes[name]
+        # The CPT row of every sample is the flat index of its parent outcomes
+        if node.parent_order:
+            rows = np.ravel_multi_index(tuple(samples[:, columns[p]] for p in node.parent_order),
+                                        node.cpt.shape[1:])
+        else:
+            rows = np.zeros(num_samples, dtype=int)
+        if name in evidence:
+            code = node.outcomes.index(evidence[name])
+            samples[:, columns[name]] = code
+            with np.errstate(divide="ignore"):
+                log_weights += np.log(node.cpt[code].reshape(-1)[rows])
+        else:
+            samples[:, columns[name]] = AliasTable.from_cpt(node.cpt).sample(rows, rng)
+    return samples, log_weights
+
+def forward_sample_matrix(bayesnet: BayesianNetwork, num_samples: int, 
+                            rng: Optional[np.random.Generator] = None) -> np.array:
+    """
+        Draws num_samples samples of all variables at once via forward 
+        sampling. For every node in ancestral order, the CPT row of every 
+        sample is computed from the already sampled parent columns and all
+        samples of the node are drawn together using alias tables.
+
+        Parameters
+        -----------
+        bayesnet: ccbase.networks.BayesianNetwork
+            The network to be sampled.
+        num_samples: int
+            The number of samples.
+        rng: np.random.Generator, optional
+            The random number generator, a new one is created by default.
+
+        Returns
+        --------
+        np.array
+            An integer matrix of shape (num_samples, number of nodes), whose
+            columns correspond to the nodes in the order of bayesnet.nodes and
+            contain the indices of the sampled outcomes.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    return _sample_matrix(bayesnet, num_samples, rng, {})[0]
+
+def likelihood_weighting_samples(bayesnet: BayesianNetwork, num_samples: int, 
+                                    evidence: Dict[str, str],
+                                    rng: Optional[np.random.Generator] = None) -> Tuple[np.array, np.array]:
+    """
+        Draws num_samples samples via likelihood weighting, i.e. forward 
+        sampling with the evidence variables clamped to their observed outcomes,
+        where every sample is weighted by the probability of the evidence 
+        given its sampled parents.
+
+        Parameters
+        -----------
+        bayesnet: ccbase.networks.BayesianNetwork
+            The network to be sampled.
+        num_samples: int
+            The number of samples.
+        evidence: Dict[str, str]
+            Node-name:outcome pairs specifying the observed evidence.
+        rng: np.random.Generator, optional
+            The random number generator, a new one is created by default.
+
+        Returns
+        --------
+        np.array
+            The sample matrix as returned by forward_sample_matrix.
+        np.array
+            The log-weight of every sample, -inf for samples that are 
+            inconsistent with the evidence.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    evidence = {bayesnet.nodes[v].name: outcome for v, outcome in evidence.items()}
+    return _sample_matrix(bayesnet, num_samples, rng, evidence)
+
+def do_likelihood_weighting(bayesnet: BayesianNetwork, evidence: Dict[str, str], 
+                            num_samples: Optional[int] = 1000,
+                            rng: Optional[np.random.Generator] = None) -> Tuple[Dict[str, Dict[str, float]], float]:
+    """
+        Approximates the posterior marginals of all variables given the
+        evidence using likelihood weighting.
+
+        Parameters
+        -----------
+        bayesnet: ccbase.networks.BayesianNetwork
+            The network to be sampled.
+        evidence: Dict[str, str]
+            Node-name:outcome pairs specifying the observed evidence.
+        num_samples: int (optional)
+            The number of samples. Default 1000.
+        rng: np.random.Generator, optional
+            The random number generator, a new one is created by default.
+
+        Returns
+        --------
+        Dict[str, Dict[str, float]]
+            The weighted marginals, i.e. a dictionary containing for every
+            node name a dictionary with its outcomes and their probabilities.
+        float
+            The effective sample size (sum w)^2 / sum w^2 of the weights.
+
+        Raises
+        ------
+        ValueError
+            If num_samples is smaller than 1 or no sample is consistent with
+            the evidence.
+    """
+    if num_samples < 1:
+        raise ValueError("At least one sample is required, got num_samples={}.".format(num_samples))
+    samples, log_weights = likelihood_weighting_samples(bayesnet, num_samples, evidence, rng)
+    if not np.any(np.isfinite(log_weights)):
+        raise ValueError("None of the samples is consistent with the evidence.")
+    # Subtracting the maximum avoids underflow for many evidence variables
+    weights = np.exp(log_weights - np.max(log_weights))
+    total = np.sum(weights)
+    effective_sample_size = float(total ** 2 / np.sum(weights ** 2))
+
+    marginals = {}
+    for column, (name, node) in enumerate(bayesnet.nodes.items()):
+        counts = np.bincount(samples[:, column], weights=weights, minlength=len(node.outcomes))
+        # Normalizing by the sum of the counts (rather than total) avoids
+        # rounding errors, e.g. evidence variables get exactly probability 1
+        counts /= np.sum(counts)
+        marginals[name] = {outcome: float(counts[i]) for i, outcome in enumerate(node.outcomes)}
+    return marginals, effective_sample_size
+
+def do_forward_sampling(bayesnet: BayesianNetwork, var_name: str, num_samples: Optional[int]=1000,
+                        rng: Optional[np.random.Generator] = None) -> Dict[str, float]:
     """
         Calculate marginals using Forward Sampling without worrying about
         dealing with evidence.
@@ -176,6 +382,8 @@ def do_forward_sampling(bayesnet: BayesianNetwork, var_name: str, num_samples: O
         num_samples: int (optional)
             The number of samples to be generated to estimate the marginal. Default
             1000.
+        rng: np.random.Generator, optional
+            The random number generator, a new one is created by default.
             
         Returns
         --------
@@ -183,27 +391,11 @@ def do_forward_sampling(bayesnet: BayesianNetwork, var_name: str, num_samples: O
             A dictionary containing the outcomes of the variable var_name
             as keys and those outcomes marginal probabilities as values.
     """    
-    ancestral_order: list = get_ancestral_ordering(bayesnet)
-    sample_list: list = []
-    query: DiscreteVariable = bayesnet.nodes.get(var_name)
-    outcomes:list = query.outcomes
-    forward_sampling: dict = {}
-    '''Generating sample by ancestral order distribution'''
-    for sample_index in range(0, num_samples):
-        outcome: dict = {}
-        for sample_name in ancestral_order:
-            next: DiscreteVariable = bayesnet.nodes.get(sample_name)
-            distribution = next.get_distribution(outcome)
-            sampled = sample(distribution)
-            outcome[next] = sampled
-
-        sample_list.append(outcome[var_name])
-
-    forward_sampling: dict = {}
-    for outcome in outcomes:
-        forward_sampling[outcome] = sample_list.count(outcome) / num_samples
-
-    return forward_sampling
+    query: DiscreteVariable = bayesnet.nodes[var_name]
+    samples = forward_sample_matrix(bayesnet, num_samples, rng)
+    column = list(bayesnet.nodes).index(query.name)
+    counts = np.bincount(samples[:, column], minlength=len(query.outcomes))
+    return {outcome: float(counts[i]) / num_samples for i, outcome in enumerate(query.outcomes)}
 
 
 ######
@@ -294,9 +486,225 @@ def get_markov_distr(node: DiscreteVariable, evidence: Dict[str, str]) -> Dict[s
 #
 ######
 
+class GibbsSampler:
+    """
+        Gibbs sampling on a compiled representation of a network.
+
+        The state of the chain is a single integer array containing the index
+        of the current outcome of every node (in the order of bayesnet.nodes).
+        The chain repeatedly resamples its units, which are single variables
+        by default (single-site Gibbs) or blocks of variables that are sampled
+        jointly from their exact conditional distribution (blocked Gibbs).
+        Variables can also be collapsed, i.e. summed out of the network via
+        variable elimination before sampling, so that only the remaining 
+        variables are sampled (collapsed Gibbs).
+
+        For every unit, the factors of its Markov blanket (the CPTs, or the
+        factors left after summing out the collapsed variables) are 
+        precompiled into 2D tables, whose rows correspond to the outcomes of
+        the other variables of the factor and whose columns correspond to the
+        joint outcomes of the unit. The conditional distribution of a unit is
+        then simply the product of one row of each of its tables.
+
+        Only the outcome counts of all nodes are accumulated, no samples are
+        stored, so that the memory requirement does not grow with the number
+        of sweeps.
+    """
+
+    def __init__(self, bayesnet: BayesianNetwork, evidence: Optional[Dict[str, str]] = None,
+                    rng: Optional[np.random.Generator] = None, 
+                    blocks: Optional[List[List[str]]] = None, collapsed: Iterable[str] = ()):
+        """
+            Parameters
+            ----------
+            bayesnet: ccbase.networks.BayesianNetwork
+                The network from which the samples should be created.
+            evidence: Dict[str, str], optional
+                Node-name:outcome pairs specifying the observed evidence.
+            rng: np.random.Generator, optional
+                The random number generator, a new one is created by default.
+            blocks: [[str]], optional
+                Groups of variables that are sampled jointly. All other 
+                variables are sampled on their own.
+            collapsed: iterable of String, optional
+                Variables that are summed out and not sampled.
+
+            Raises
+            ------
+            ValueError
+                If a block or collapsed variable is observed, a variable is 
+                part of multiple blocks or collapsed, or if no initial state 
+                consistent with the evidence is found.
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.names = list(bayesnet.nodes)
+        self.outcomes = [bayesnet.nodes[name].outcomes for name in self.names]
+        self.evidence = {bayesnet.nodes[v].name: outcome for v, outcome in (evidence or {}).items()}
+        self.collapsed = {bayesnet.nodes[v].name for v in collapsed}
+        columns = {name: i for i, name in enumerate(self.names)}
+
+        unit_of = {}
+        for block in blocks or []:
+            block = [bayesnet.nodes[v].name for v in block]
+            for name in block:
+                if name in self.evidence or name in self.collapsed or name in unit_of:
+                    raise ValueError("The block variable {} is observed, collapsed or " 
+                                        "part of another block.".format(name))
+                unit_of[name] = block
+        if self.collapsed & set(self.evidence):
+            raise ValueError("Observed variables cannot be collapsed.")
+        # The units are sampled in the order of their first variable in the network
+        self.units = []
+        added = set()
+        for name in self.names:
+            if name in self.evidence or name in self.collapsed or name in added:
+                continue
+            unit = unit_of.get(name, [name])
+            added.update(unit)
+            self.units.append(np.array([columns[v] for v in unit], dtype=np.intp))
+
+        factors = self._sum_out(bayesnet, [Factor.from_node(node) for node in bayesnet.nodes.values()])
+        factors = [([columns[v] for v in f.variable_order], np.asarray(f.potentials, dtype=float))
+                    for f in factors]
+        sizes = [len(outcomes) for outcomes in self.outcomes]
+        self.blankets = [self._compile_blanket(factors, list(unit), sizes) for unit in self.units]
+        self.unit_shapes = [tuple(sizes[c] for c in unit) for unit in self.units]
+        self.state = self._initial_state(bayesnet)
+
+        # The counts of all nodes are stored in one flat array, the counts of
+        # node i start at offsets[i]
+        self.offsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp)
+        self.counts = np.zeros(sum(sizes), dtype=np.int64)
+        self.num_samples = 0
+
+    def _sum_out(self, bayesnet: BayesianNetwork, factors: List[Factor]) -> List[Factor]:
+        """
+            Sums the collapsed variables out of the given factors using 
+            variable elimination. Evidence variables remain in the factors,
+            their columns of the state are simply never changed.
+        """
+        if not self.collapsed:
+            return factors
+        for v in elimination.get_constrained_ordering(bayesnet, self.collapsed):
+            bucket = Factor()
+            remaining = []
+            for f in factors:
+                if v in f.variable_order:
+                    bucket = bucket * f
+                else:
+                    remaining.append(f)
+            factors = remaining + [bucket.marginalize(v)]
+        return factors
+
+    @staticmethod
+    def _compile_blanket(factors: List[Tuple[List[int], np.array]], unit: List[int], 
+                            sizes: List[int]) -> List[Tuple[np.array, np.array, np.array]]:
+        """
+            Compiles the factors containing any variable of the unit into 
+            tuples of (table, columns, strides): The rows of the table are 
+            indexed by the dot product of the state at the given columns with
+            the strides, its columns by the flat index of the unit's outcomes.
+        """
+        blanket = []
+        for scope, potentials in factors:
+            inside = [c for c in unit if c in scope]
+            if not inside:
+                continue
+            others = [c for c in scope if c not in unit]
+            table = np.transpose(potentials, [scope.index(c) for c in others + inside])
+            # Unit variables outside of the factor's scope get broadcast dimensions
+            dims = table.shape[:len(others)]
+            table = table.reshape(dims + tuple(sizes[c] if c in scope else 1 for c in unit))
+            table = np.broadcast_to(table, dims + tuple(sizes[c] for c in unit))
+            strides = [int(np.prod(dims[i + 1:], dtype=np.int64)) for i in range(len(dims))]
+            blanket.append((np.ascontiguousarray(table).reshape(int(np.prod(dims, dtype=np.int64)), -1),
+                            np.array(others, dtype=np.intp),
+                            np.array(strides, dtype=np.int64)))
+        return blanket
+
+    def _initial_state(self, bayesnet: BayesianNetwork, attempts: int = 1000) -> np.array:
+        """
+            Draws the initial state via likelihood weighting, so that it has a 
+            positive probability given the evidence.
+        """
+        samples, log_weights = likelihood_weighting_samples(bayesnet, attempts, self.evidence, self.rng)
+        consistent = np.flatnonzero(np.isfinite(log_weights))
+        if not len(consistent):
+            raise ValueError("Could not find an initial state consistent with the evidence.")
+        return samples[consistent[0]].astype(np.intp)
+
+    def local_distribution(self, position: int) -> np.array:
+        """
+            Computes the unnormalized distribution of the position-th unit
+            given the current state of its Markov blanket, as a flat array
+            over the joint outcomes of the unit.
+        """
+        state = self.state
+        probs = None
+        for table, columns, strides in self.blankets[position]:
+            row = table[int(np.dot(state[columns], strides))]
+            probs = row.copy() if probs is None else probs * row
+        return probs
+
+    def sweep(self):
+        """
+            Resamples every unit once, in the order of the network.
+        """
+        uniforms = self.rng.random(len(self.units))
+        for position, unit in enumerate(self.units):
+            cumulative = np.cumsum(self.local_distribution(position))
+            code = int(np.searchsorted(cumulative, uniforms[position] * cumulative[-1], side="right"))
+            code = min(code, len(cumulative) - 1)
+            if len(unit) == 1:
+                self.state[unit[0]] = code
+            else:
+                self.state[unit] = np.unravel_index(code, self.unit_shapes[position])
+
+    def run(self, num_samples: int, burn_in: int = 0, thinning: int = 1):
+        """
+            Performs burn_in sweeps without counting and then counts the 
+            state after every thinning-th of the following sweeps until 
+            num_samples states have been counted.
+            Can be called repeatedly to continue the chain.
+        """
+        for _ in range(burn_in):
+            self.sweep()
+        for _ in range(num_samples):
+            for _ in range(thinning):
+                self.sweep()
+            # Every node has its own offset, so all indices are distinct
+            self.counts[self.offsets + self.state] += 1
+        self.num_samples += num_samples
+
+    def marginal(self, var_name: str) -> Dict[str, float]:
+        """
+            Returns the estimated marginal of the given variable from the 
+            states counted so far.
+
+            Raises
+            ------
+            ValueError
+                If the variable is collapsed, as it is not sampled.
+        """
+        if var_name in self.collapsed:
+            raise ValueError("The variable {} is collapsed and not sampled.".format(var_name))
+        i = self.names.index(var_name)
+        counts = self.counts[self.offsets[i]:self.offsets[i] + len(self.outcomes[i])]
+        total = max(self.num_samples, 1)
+        return {outcome: float(counts[j]) / total for j, outcome in enumerate(self.outcomes[i])}
+
+    def marginals(self) -> Dict[str, Dict[str, float]]:
+        """
+            Returns the estimated marginals of all variables that are not collapsed.
+        """
+        return {name: self.marginal(name) for name in self.names if name not in self.collapsed}
+
 def do_gibbs_sampling(bayesnet: BayesianNetwork, var_name: str, evidence: Dict[str, str], 
                         num_samples: Optional[int] =1000, 
-                        burn_in_period_length: Optional[int] =100, thinning: Optional[int] =1) -> Dict[str, float]:
+                        burn_in_period_length: Optional[int] =100, thinning: Optional[int] =1,
+                        rng: Optional[np.random.Generator] = None, 
+                        blocks: Optional[List[List[str]]] = None, 
+                        collapsed: Iterable[str] = ()) -> Dict[str, float]:
     """
         Calculate marginals using Gibbs Sampling.
         Hint: Remember that you will have to sample from the local probability
@@ -312,13 +720,22 @@ def do_gibbs_sampling(bayesnet: BayesianNetwork, var_name: str, evidence: Dict[s
             A dictionary containing node_name: outcome pairs to specify the
             evidence.
         num_samples: int (optional)
-            Number of samples to be used for the marginal computation after the burn_in_period. 
-            Default 1000.
+            Number of samples to be used for the marginal computation after the 
+            burn_in_period, where every sample is the state after a full sweep,
+            i.e. after resampling all non-evidence units once. Default 1000.
         burn_in_period_length: int (optional) 
-            Number of samples that are discarded at the beginning. Default 100.
+            Number of full sweeps that are discarded at the beginning. Default 100.
         thinning: int (optional)
-            Only take every nth sample for the calculation of the marginal. 
-            Default 1.
+            Only count the state after every nth sweep for the calculation of
+            the marginal. Default 1.
+        rng: np.random.Generator, optional
+            The random number generator, a new one is created by default.
+        blocks: [[str]], optional
+            Groups of strongly coupled variables that are sampled jointly
+            (blocked Gibbs), see GibbsSampler.
+        collapsed: iterable of String, optional
+            Variables that are summed out before sampling (collapsed Gibbs),
+            must not contain var_name.
          
         Returns
         -------
@@ -327,47 +744,253 @@ def do_gibbs_sampling(bayesnet: BayesianNetwork, var_name: str, evidence: Dict[s
             as keys and those outcomes marginal probabilities as values
             obtained by gibbs sampling.
     """
-    
-    initial_sample: dict = create_initial_sample(bayesnet,evidence)
-    state_sample = []
-    state_sample.append(initial_sample)
-    prev_state: dict = initial_sample
-    i = 0
-    '''Generating sample until number asked'''
-    while len(state_sample) < num_samples:
-        '''For each node I calculate the distribution by using the parental state from the prev state'''
-        for node_name in bayesnet.nodes:
-            node: DiscreteVariable = bayesnet.nodes.get(node_name)
-            parental_state = {key:value for key, value in prev_state.items() if key != node_name}
-
-            distribution = get_markov_distr(node, parental_state)
-
-            '''Generate the sample and updating prev_state'''
-            actual_sample = sample(distribution)
-            parental_state[node_name] = actual_sample
-            prev_state = parental_state
-            '''Skipping burn_in_period_length and thinning'''
-            if i >= burn_in_period_length:
-                if i % thinning == 0:
-                    state_sample.append(prev_state)
-                    if len(state_sample) == num_samples:
-                        break
-                # else:
-                    # print("skipping thinnin")
-            # else:    
-                # print("skipping burn_in_period_length")
-            i+=1
-    outcomes = []
-    '''Create outcomes for the var requested'''
-    for state in state_sample:
-        outcomes.append(state[var_name])
-    gibbs_sampling: dict = {}
-    
-    '''Normalize outcomes'''
-    for outcome in outcomes:
-        gibbs_sampling[outcome] = outcomes.count(outcome) / num_samples
-        
-    return gibbs_sampling
+    sampler = GibbsSampler(bayesnet, evidence, rng, blocks, collapsed)
+    sampler.run(num_samples, burn_in_period_length, thinning)
+    return sampler.marginal(bayesnet.nodes[var_name].name)
+
+def split_r_hat(batch_means: np.array) -> float:
+    """
+        Computes the split potential scale reduction factor R-hat of the
+        given sequences, after splitting every chain into two halves.
+        Values close to 1 indicate that the chains have mixed.
+
+        Parameters
+        ----------
+        batch_means: np.array
+            An array of shape (chains, batches) containing e.g. the batch 
+            means of a statistic in every chain.
+
+        Returns
+        -------
+        float
+            The split R-hat, inf if there are too few batches or if the
+            sequences never change within any chain. Constant sequences only
+            show that the statistic was never seen to move, not that the 
+            chains have mixed (e.g. chains stuck in a deterministic mode).
+    """
+    batch_means = np.asarray(batch_means, dtype=float)
+    half = batch_means.shape[1] // 2
+    if half < 2:
+        return float("inf")
+    # For an odd number of batches the first one is dropped
+    halves = np.concatenate((batch_means[:, -2 * half:-half], batch_means[:, -half:]))
+    within = np.mean(np.var(halves, axis=1, ddof=1))
+    between = half * np.var(np.mean(halves, axis=1), ddof=1)
+    if within == 0:
+        return float("inf")
+    return float(np.sqrt(((half - 1) / half * within + between / half) / within))
+
+def batch_means_ess(batch_means: np.array, batch_size: int) -> float:
+    """
+        Estimates the effective sample size of the mean of an indicator 
+        variable from its batch means, i.e. the number of independent samples
+        that would give the same variance as the batch means method.
+
+        Parameters
+        ----------
+        batch_means: np.array
+            An array of shape (chains, batches) containing the fraction of
+            samples in every batch for which the indicator was true.
+        batch_size: int
+            The number of samples per batch.
+
+        Returns
+        -------
+        float
+            The effective sample size, summed over all chains. 0 if the 
+            batch means never change within any chain, as no mixing was 
+            observed then.
+    """
+    batch_means = np.asarray(batch_means, dtype=float)
+    num_samples = batch_means.size * batch_size
+    if batch_means.shape[1] < 2:
+        return 0.0
+    mean = np.mean(batch_means)
+    # Variance of a single sample vs. the variance of the batch means scaled
+    # to a single sample, which includes the autocorrelation within batches
+    sample_var = mean * (1 - mean)
+    asymptotic_var = batch_size * np.mean(np.var(batch_means, axis=1, ddof=1))
+    if asymptotic_var == 0:
+        return 0.0
+    return float(num_samples * sample_var / asymptotic_var)
+
+def _run_batches(sampler: GibbsSampler, column: int, num_batches: int, batch_size: int, 
+                    burn_in: int) -> np.array:
+    """
+        Private helper continuing a single chain. Returns the outcome counts
+        of the given column for every batch.
+    """
+    start = sampler.offsets[column]
+    stop = start + len(sampler.outcomes[column])
+    batches = np.zeros((num_batches, stop - start), dtype=np.int64)
+    sampler.run(0, burn_in)
+    for k in range(num_batches):
+        before = sampler.counts[start:stop].copy()
+        sampler.run(batch_size)
+        batches[k] = sampler.counts[start:stop] - before
+    return batches
+
+def _chain_worker(connection, samplers: List[GibbsSampler], column: int, batch_size: int):
+    """
+        Private helper running in a long-lived worker process, which keeps
+        its chains alive between rounds. Every received (num_batches, burn_in)
+        message advances all its chains and only their batch counts are sent
+        back. None ends the worker.
+    """
+    try:
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            num_batches, burn_in = message
+            connection.send([_run_batches(sampler, column, num_batches, batch_size, burn_in)
+                                for sampler in samplers])
+    except Exception as e:
+        connection.send(e)
+    finally:
+        connection.close()
+
+def do_multi_chain_gibbs_sampling(bayesnet: BayesianNetwork, var_name: str, evidence: Dict[str, str],
+                                    num_chains: int = 4, seed: Optional[int] = None,
+                                    r_hat_threshold: float = 1.01, min_ess: float = 1000,
+                                    max_samples: int = 100000, burn_in_period_length: int = 100,
+                                    batch_size: int = 50, batches_per_round: int = 10,
+                                    parallel: bool = True, max_workers: Optional[int] = None,
+                                    blocks: Optional[List[List[str]]] = None,
+                                    collapsed: Iterable[str] = ()) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+        Calculate marginals using several independent Gibbs chains, which 
+        are run until they have mixed.
+
+        The chains are advanced in rounds of batches_per_round batches of 
+        batch_size sweeps each. After every round, the split R-hat and the 
+        effective sample size of the outcome indicators of var_name are 
+        computed from the batch means of all chains, and all chains stop once
+        both cross their thresholds (or max_samples is reached). If the 
+        query never changes within any chain, e.g. because the chains are 
+        stuck in a deterministic mode, the chains are not considered 
+        converged and run until max_samples.
+
+        Parameters
+        ----------
+        bayesnet: ccbase.networks.BayesianNetwork
+            The network from which the samples should be created.
+        var_name: str
+            The variable to calculate marginals for.
+        evidence: Dict[str, str]
+            A dictionary containing node_name: outcome pairs to specify the
+            evidence.
+        num_chains: int, optional
+            The number of chains. Default 4.
+        seed: int, optional
+            Seed from which the independent random streams of the chains 
+            are spawned.
+        r_hat_threshold: float, optional
+            The largest accepted split R-hat. Default 1.01.
+        min_ess: float, optional
+            The smallest accepted effective sample size. Default 1000.
+        max_samples: int, optional
+            The maximum number of samples per chain. Default 100000.
+        burn_in_period_length: int, optional
+            Number of sweeps discarded at the beginning of every chain. Default 100.
+        batch_size: int, optional
+            Number of samples per batch of the batch means. Default 50.
+        batches_per_round: int, optional
+            Number of batches between two convergence checks. Default 10.
+        parallel: bool, optional
+            Whether the chains are run in worker processes (default) or
+            sequentially in this process. Every worker keeps its chains 
+            alive between rounds and only sends back the batch counts, so 
+            that starting the workers is the only overhead.
+        max_workers: int, optional
+            The number of worker processes, the chains are distributed among
+            them. Defaults to the number of CPUs, at most one per chain.
+        blocks: [[str]], optional
+            Groups of variables that are sampled jointly, see GibbsSampler.
+        collapsed: iterable of String, optional
+            Variables that are summed out before sampling, see GibbsSampler.
+
+        Returns
+        -------
+        Dict[str, float]
+            A dictionary containing the outcome of the variable var_name
+            as keys and those outcomes marginal probabilities as values,
+            pooled over all chains.
+        Dict[str, float]
+            The diagnostics "r_hat", "ess", "samples" (per chain) and 
+            "converged" of the final round.
+
+        Raises
+        ------
+        ValueError
+            If max_samples is smaller than batch_size.
+    """
+    if max_samples < batch_size:
+        raise ValueError("max_samples ({}) must be at least batch_size ({}).".format(max_samples, batch_size))
+    var_name = bayesnet.nodes[var_name].name
+    streams = np.random.SeedSequence(seed).spawn(num_chains)
+    samplers = [GibbsSampler(bayesnet, evidence, np.random.default_rng(s), blocks, collapsed) 
+                for s in streams]
+    column = samplers[0].names.index(var_name)
+    outcomes = samplers[0].outcomes[column]
+    batches = np.zeros((num_chains, 0, len(outcomes)), dtype=np.int64)
+
+    workers = []
+    try:
+        if parallel:
+            num_workers = min(max_workers or os.cpu_count() or 1, num_chains)
+            for w in range(num_workers):
+                group = list(range(w, num_chains, num_workers))
+                connection, child_connection = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_chain_worker, daemon=True,
+                                                    args=(child_connection, [samplers[i] for i in group],
+                                                            column, batch_size))
+                process.start()
+                child_connection.close()
+                workers.append((process, connection, group))
+
+        burn_in = burn_in_period_length
+        while True:
+            num_batches = min(batches_per_round, (max_samples - batches.shape[1] * batch_size) // batch_size)
+            if workers:
+                # All workers run their chains concurrently before the results are collected
+                for _, connection, _ in workers:
+                    connection.send((num_batches, burn_in))
+                results = [None] * num_chains
+                for _, connection, group in workers:
+                    result = connection.recv()
+                    if isinstance(result, Exception):
+                        raise result
+                    for i, chain_batches in zip(group, result):
+                        results[i] = chain_batches
+            else:
+                results = [_run_batches(sampler, column, num_batches, batch_size, burn_in) 
+                            for sampler in samplers]
+            batches = np.concatenate((batches, np.stack(results)), axis=1)
+            burn_in = 0
+
+            # Diagnostics of the worst outcome indicator
+            means = batches / batch_size
+            r_hat = max(split_r_hat(means[:, :, j]) for j in range(len(outcomes)))
+            ess = min(batch_means_ess(means[:, :, j], batch_size) for j in range(len(outcomes)))
+            converged = r_hat <= r_hat_threshold and ess >= min_ess
+            if converged or (batches.shape[1] + 1) * batch_size > max_samples:
+                break
+    finally:
+        for process, connection, _ in workers:
+            try:
+                connection.send(None)
+            except OSError:
+                # The worker already ended after an error
+                pass
+            connection.close()
+            process.join()
+
+    counts = batches.sum(axis=(0, 1))
+    marginal = {outcome: float(counts[j] / counts.sum()) for j, outcome in enumerate(outcomes)}
+    diagnostics = {"r_hat": r_hat, "ess": ess, "samples": batches.shape[1] * batch_size, 
+                    "converged": converged}
+    return marginal, diagnostics
 
 ######
 #
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Heuristics for computing elimination orders of Bayesian networks.
+
+All heuristics are greedy: They repeatedly eliminate the variable with the
+lowest score from the moral graph of the network, connecting its neighbours.
+A heuristic is simply a function score(adjacency, weights, node) returning
+a comparable value, where adjacency contains the current neighbour sets of
+all variables (as integer ids) and weights their number of outcomes. Custom
+heuristics can therefore be passed directly instead of one of the names in
+HEURISTICS.
+"""
+
+import heapq
+import random
+from typing import Union, Optional, List, Dict, Iterable, Tuple, Callable
+
+
+def moral_adjacency(bn, nodes: Optional[Iterable[str]] = None) -> Tuple[List[str], List[set], List[int]]:
+    """
+        Computes the moral graph of the given network as integer adjacency
+        sets, where every node is represented by its position in bn.nodes.
+
+        Parameters
+        ----------
+        bn: BayesianNetwork
+            The network whose moral graph is computed.
+        nodes: iterable of String, optional
+            If given, only the subnetwork induced by these nodes is
+            considered. Their ids follow their order in bn.nodes.
+
+        Returns
+        -------
+        [str]
+            The node names, the index of a name is its integer id.
+        [set]
+            The set of neighbour ids for every node id.
+        [int]
+            The number of outcomes of every node id.
+    """
+    if nodes is None:
+        names = list(bn.nodes)
+    else:
+        nodes = set(nodes)
+        names = [name for name in bn.nodes if name in nodes]
+    ids = {name: i for i, name in enumerate(names)}
+    adjacency = [set() for _ in names]
+    for name in names:
+        family = [ids[name]] + [ids[p] for p in bn.nodes[name].parents if p in ids]
+        # Connecting a node with its parents and all parents with each other
+        for i in family:
+            adjacency[i].update(family)
+            adjacency[i].discard(i)
+    weights = [len(bn.nodes[name].outcomes) for name in names]
+    return names, adjacency, weights
+
+
+######
+#
+# Heuristics
+#
+######
+
+def min_neighbors(adjacency: List[set], weights: List[int], node: int) -> int:
+    """
+        The number of neighbours of node in the current graph, i.e. its
+        degree. min_degree is an alias for this heuristic.
+    """
+    return len(adjacency[node])
+
+def min_weight(adjacency: List[set], weights: List[int], node: int) -> int:
+    """
+        The size of the factor created when eliminating node, i.e. the
+        product of the number of outcomes of node and all its neighbours.
+    """
+    size = weights[node]
+    for n in adjacency[node]:
+        size *= weights[n]
+    return size
+
+def min_fill(adjacency: List[set], weights: List[int], node: int) -> int:
+    """
+        The number of edges that need to be added between the neighbours of
+        node when eliminating it.
+    """
+    neighbours = adjacency[node]
+    # Every neighbour counts the other neighbours it is not yet connected to,
+    # which counts every missing edge twice
+    missing = sum(len(neighbours) - 1 - len(adjacency[n] & neighbours) for n in neighbours)
+    return missing // 2
+
+def weighted_min_fill(adjacency: List[set], weights: List[int], node: int) -> int:
+    """
+        The sum of the weights of the edges that need to be added between
+        the neighbours of node when eliminating it, where the weight of an
+        edge is the product of the number of outcomes of its two ends.
+    """
+    neighbours = adjacency[node]
+    cost = 0
+    for n in neighbours:
+        missing = neighbours - adjacency[n]
+        missing.discard(n)
+        cost += weights[n] * sum(weights[m] for m in missing)
+    return cost // 2
+
+HEURISTICS: Dict[str, Callable[[List[set], List[int], int], int]] = {
+    "min_degree": min_neighbors,
+    "min_neighbors": min_neighbors,
+    "min_weight": min_weight,
+    "min_fill": min_fill,
+    "weighted_min_fill": weighted_min_fill,
+}
+
+
+######
+#
+# Greedy elimination
+#
+######
+
+def greedy_ordering(adjacency: List[set], weights: List[int],
+                    heuristic: Callable[[List[set], List[int], int], int],
+                    rng: Optional[random.Random] = None,
+                    candidates: Optional[Iterable[int]] = None) -> Tuple[List[int], int]:
+    """
+        Greedily eliminates the (candidate) nodes of the given graph, always
+        choosing the node with the lowest score. The adjacency sets are modified in place.
+
+        Scores are kept in a heap and only the scores of the neighbours of an
+        eliminated node, and of nodes adjacent to both ends of a new fill-in
+        edge, are recomputed after every step.
+
+        Parameters
+        ----------
+        adjacency: [set]
+            The neighbour ids of every node id. Will be consumed.
+        weights: [int]
+            The number of outcomes of every node id.
+        heuristic: callable
+            The scoring function, see HEURISTICS.
+        rng: random.Random, optional
+            If given, ties are broken randomly instead of by node id.
+        candidates: iterable of int, optional
+            The ids of the nodes to eliminate. All nodes by default, the
+            remaining nodes are kept in the graph.
+
+        Returns
+        -------
+        [int]
+            The elimination order as node ids.
+        int
+            The size of the largest factor created during the elimination.
+    """
+    def _key(node):
+        return rng.random() if rng else node
+
+    if candidates is None:
+        candidates = range(len(adjacency))
+    # Nodes that are not candidates are marked as eliminated from the start
+    eliminated = [True] * len(adjacency)
+    scores = [None] * len(adjacency)
+    for i in candidates:
+        eliminated[i] = False
+        scores[i] = heuristic(adjacency, weights, i)
+    # Entries whose score changed are skipped lazily when they are popped
+    heap = [(scores[i], _key(i), i) for i in range(len(adjacency)) if not eliminated[i]]
+    heapq.heapify(heap)
+    order = []
+    max_size = 1
+
+    while heap:
+        score, _, node = heapq.heappop(heap)
+        if eliminated[node] or score != scores[node]:
+            continue
+        eliminated[node] = True
+        order.append(node)
+
+        neighbours = adjacency[node]
+        max_size = max(max_size, min_weight(adjacency, weights, node))
+        changed = set(neighbours)
+        for n in neighbours:
+            adjacency[n].discard(node)
+        # Connecting the neighbours with each other. Besides the neighbours
+        # themselves, only nodes adjacent to both ends of a new edge change their score.
+        for n in neighbours:
+            new_edges = neighbours - adjacency[n]
+            new_edges.discard(n)
+            for m in new_edges:
+                changed.update(adjacency[n] & adjacency[m])
+            adjacency[n].update(new_edges)
+        adjacency[node] = set()
+
+        for n in changed:
+            if eliminated[n]:
+                continue
+            new_score = heuristic(adjacency, weights, n)
+            if new_score != scores[n]:
+                scores[n] = new_score
+                heapq.heappush(heap, (new_score, _key(n), n))
+
+    return order, max_size
+
+def _get_heuristic(heuristic: Union[str, Callable]) -> Callable:
+    if callable(heuristic):
+        return heuristic
+    try:
+        return HEURISTICS[heuristic]
+    except KeyError:
+        raise ValueError("Unknown heuristic {}, use one of {}".format(heuristic, list(HEURISTICS)))
+
+def get_constrained_ordering(bn, eliminate: Iterable[str], nodes: Optional[Iterable[str]] = None,
+                                instantiated: Iterable[str] = (), heuristic: Union[str, Callable] = "min_fill",
+                                restarts: int = 0, seed: Optional[int] = None,
+                                then: Iterable[str] = ()) -> List[str]:
+    """
+        Computes an elimination order for only some of the variables in
+        (a part of) the network, while the other variables remain in the graph.
+        The variables in then are only eliminated after all variables in
+        eliminate, as required e.g. when summing before maximizing.
+
+        Parameters
+        ----------
+        bn: BayesianNetwork
+            The network for which the elimination order is computed.
+        eliminate: iterable of String
+            The names of the variables that are to be eliminated.
+        nodes: iterable of String, optional
+            If given, only the subnetwork induced by these nodes is considered.
+            Must contain all variables in eliminate.
+        instantiated: iterable of String, optional
+            Variables which are fixed by evidence and removed from the factors,
+            so that they are removed from the moral graph before elimination.
+        heuristic: String or callable, optional
+            Either the name of one of the HEURISTICS or a custom scoring
+            function. Defaults to min_fill.
+        restarts: int, optional
+            The number of additional runs with random tie-breaking. The
+            order with the smallest largest factor is returned, preferring
+            the deterministic run on ties.
+        seed: int, optional
+            Seed for the random tie-breaking.
+        then: iterable of String, optional
+            Variables that are to be eliminated after those in eliminate.
+
+        Returns
+        -------
+        [str]
+            The names of the variables in eliminate, followed by those in
+            then, in elimination order.
+
+        Raises
+        ------
+        ValueError
+            When the heuristic name is unknown.
+    """
+    heuristic = _get_heuristic(heuristic)
+    names, adjacency, weights = moral_adjacency(bn, nodes)
+    ids = {name: i for i, name in enumerate(names)}
+    for name in instantiated:
+        if name in ids:
+            for n in adjacency[ids[name]]:
+                adjacency[n].discard(ids[name])
+            adjacency[ids[name]] = set()
+    stages = [[ids[name] for name in eliminate], [ids[name] for name in then]]
+
+    rng = random.Random(seed)
+    best_order, best_size = None, None
+    for run in range(restarts + 1):
+        # The later stage continues on the graph left over by the former one
+        working_adjacency = [set(a) for a in adjacency]
+        order, size = [], 1
+        for candidates in stages:
+            stage_order, stage_size = greedy_ordering(working_adjacency, weights, heuristic,
+                                                        rng if run > 0 else None, candidates)
+            order.extend(stage_order)
+            size = max(size, stage_size)
+        if best_size is None or size < best_size:
+            best_order, best_size = order, size
+    return [names[i] for i in best_order]
+
+def get_elimination_ordering(bn, heuristic: Union[str, Callable] = "min_fill",
+                                restarts: int = 0, seed: Optional[int] = None) -> List[str]:
+    """
+        Computes an elimination order of all the variables in the network
+        using the given greedy heuristic.
+
+        Parameters
+        ----------
+        bn: BayesianNetwork
+            The network for which the elimination order is computed.
+        heuristic: String or callable, optional
+            Either the name of one of the HEURISTICS or a custom scoring
+            function. Defaults to min_fill.
+        restarts: int, optional
+            The number of additional runs with random tie-breaking. The
+            order with the smallest largest factor is returned, preferring
+            the deterministic run on ties.
+        seed: int, optional
+            Seed for the random tie-breaking.
+
+        Returns
+        -------
+        [str]
+            A list containing the names of all the nodes in the network.
+
+        Raises
+        ------
+        ValueError
+            When the heuristic name is unknown.
+    """
+    return get_constrained_ordering(bn, bn.nodes, heuristic=heuristic, restarts=restarts, seed=seed)
+
+def get_max_factor_size(bn, order: List[str]) -> int:
+    """
+        Computes the size of the largest factor that is created when
+        eliminating the variables of the network in the given order.
+
+        Parameters
+        ----------
+        bn: BayesianNetwork
+            The network the order belongs to.
+        order: [str]
+            The names of the variables in elimination order.
+
+        Returns
+        -------
+        int
+            The number of entries of the largest created factor.
+    """
+    names, adjacency, weights = moral_adjacency(bn)
+    ids = {name: i for i, name in enumerate(names)}
+    max_size = 1
+    for name in order:
+        node = ids[name]
+        neighbours = adjacency[node]
+        max_size = max(max_size, min_weight(adjacency, weights, node))
+        for n in neighbours:
+            adjacency[n].discard(node)
+            adjacency[n].update(neighbours - {n})
+        adjacency[node] = set()
+    return max_size
@@ -9,10 +9,12 @@ need our graph class and its subclass for Bayesian networks.
 from __future__ import annotations
 
 import copy
-from typing import Union, Optional, List, Dict, Iterable
+from collections import deque
+from typing import Union, Optional, List, Dict, Iterable, Callable
 
 from .nodes import DiscreteVariable, Node
 from .factor import Factor
+from . import elimination
 
 import numpy as np
 
@@ -181,14 +183,14 @@ class Graph:
         """
         if not node in self.nodes:
             raise ValueError("The graph does not contain a node called {}".format(node))
-        def _add_parents(tmpNode):
-            for p in tmpNode.parents.values():
-                if p in res:
-                    continue
-                res.add(p)
-                _add_parents(p)
+        # Iterative traversal, so that deep graphs do not hit the recursion limit
         res = set()
-        _add_parents(self.nodes[node])
+        stack = [self.nodes[node]]
+        while stack:
+            for p in stack.pop().parents.values():
+                if p not in res:
+                    res.add(p)
+                    stack.append(p)
         return res
 
     def is_ancestor(self, node_a: Union[str, Node], node_b: Union[str, Node]) -> bool:
@@ -322,6 +324,74 @@ class BayesianNetwork(Graph):
     def __init__(self):
         #Call the constructor of the Graph class.
         super(BayesianNetwork, self).__init__()
+        # Cached topological order, reset whenever the structure changes
+        self._topological_order = None
+
+    def add_node(self, node: Union[str, Node]):
+        """
+            Adds a node to the network, see Graph.add_node,
+            and resets the cached topological order.
+        """
+        super(BayesianNetwork, self).add_node(node)
+        self._topological_order = None
+
+    def remove_node(self, node: Union[str, Node]):
+        """
+            Removes a node from the network, see Graph.remove_node,
+            and resets the cached topological order.
+        """
+        super(BayesianNetwork, self).remove_node(node)
+        self._topological_order = None
+
+    def add_edge(self, node1: Union[str, Node], node2: Union[str, Node]):
+        """
+            Adds an edge to the network, see Graph.add_edge,
+            and resets the cached topological order.
+        """
+        super(BayesianNetwork, self).add_edge(node1, node2)
+        self._topological_order = None
+
+    def remove_edge(self, node1: Union[str, Node], node2: Union[str, Node]):
+        """
+            Removes an edge from the network, see Graph.remove_edge,
+            and resets the cached topological order.
+        """
+        super(BayesianNetwork, self).remove_edge(node1, node2)
+        self._topological_order = None
+
+    def get_topological_order(self) -> List[str]:
+        """
+            Computes a topological (ancestral) order of the nodes using Kahn's
+            algorithm in O(V+E), i.e. every node appears after all its parents.
+            Ties are broken by the order in which the nodes were added, so that
+            the order is deterministic. The order is cached until the next
+            change of the network structure.
+
+            Returns
+            -------
+            [str]
+                The names of all nodes in topological order.
+
+            Raises
+            ------
+            ValueError
+                When the network contains a cycle.
+        """
+        if self._topological_order is None:
+            in_degree = {name: len(node.parents) for name, node in self.nodes.items()}
+            queue = deque(name for name, degree in in_degree.items() if degree == 0)
+            order = []
+            while queue:
+                name = queue.popleft()
+                order.append(name)
+                for child in self.nodes[name].children:
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        queue.append(child)
+            if len(order) != len(self.nodes):
+                raise ValueError("The network contains a cycle and has no topological order.")
+            self._topological_order = order
+        return list(self._topological_order)
         
     def marginals(self, node: Union[str, DiscreteVariable], evidence: Optional[Dict[str,str]]=None) -> np.array:
         """
@@ -432,11 +502,28 @@ class BayesianNetwork(Graph):
                     
                 
                     
-    def get_elimination_ordering(self) -> List[str]:
-       """
-           Dummy elimination order implementation.
-       """
-       return list(self.nodes.keys())
+    def get_elimination_ordering(self, heuristic: Union[str, Callable] = "min_fill",
+                                    restarts: int = 0, seed: Optional[int] = None) -> List[str]:
+        """
+            Computes an elimination order of all variables in this network,
+            see ccbase.elimination.get_elimination_ordering for details.
+
+            Parameters
+            ----------
+            heuristic: String or callable, optional
+                The name of a heuristic in ccbase.elimination.HEURISTICS or a
+                custom scoring function. Defaults to min_fill.
+            restarts: int, optional
+                The number of additional runs with random tie-breaking.
+            seed: int, optional
+                Seed for the random tie-breaking.
+
+            Returns
+            -------
+            [str]
+                The names of all variables in elimination order.
+        """
+        return elimination.get_elimination_ordering(self, heuristic, restarts, seed)
     
     def to_undirected(self):
         raise NotImplementedError("A Bayesian Network cannot be undirected!")
\ No newline at end of file
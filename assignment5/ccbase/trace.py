@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Opt-in tracing of factor operations and variable elimination steps.
+
+Tracing is disabled unless a Tracer is active, in which case every call of
+Factor.multiply, Factor.marginalize and Factor.reduce is recorded, grouped
+by the elimination step it belongs to:
+
+    with Tracer() as tracer:
+        calculate_probabilities(bn, ["rain"])
+    tracer.to_json("trace.json")
+    print(tracer.flame_summary("mult_adds"))
+"""
+
+import functools
+import json
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Iterable
+
+# Stack of the currently active tracers, only the innermost one records
+_tracers = []
+
+
+def _scope(factor) -> List[str]:
+    return list(factor.variable_order)
+
+
+class _Step(object):
+    """
+        An elimination step of an active tracer, collecting the factor
+        operations performed while eliminating the variable.
+    """
+
+    def __init__(self, tracer, kind: str, variable: str, factors: Iterable):
+        self.tracer = tracer
+        self.event = OrderedDict([
+            ("type", "step"), ("kind", kind), ("variable", variable),
+            ("bucket", [_scope(f) for f in factors if variable in f.variable_order]),
+            ("result_scope", None), ("shape", None),
+            ("bytes", 0), ("seconds", 0.0), ("mult_adds", 0), ("operations", [])])
+
+    def __enter__(self):
+        self.tracer._steps.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.event["seconds"] = time.perf_counter() - self._start
+        self.tracer._steps.pop()
+        self.tracer.events.append(self.event)
+        return False
+
+    def set_result(self, factor):
+        """
+            Sets the factor resulting from this step. By default, the result
+            of the last operation of the step is used.
+        """
+        self.event["result_scope"] = _scope(factor)
+        self.event["shape"] = list(factor.potentials.shape)
+
+    def _add(self, operation: dict):
+        self.event["operations"].append(operation)
+        self.event["bytes"] += operation["bytes"]
+        self.event["mult_adds"] += operation["mult_adds"]
+        self.event["result_scope"] = operation["result_scope"]
+        self.event["shape"] = operation["shape"]
+
+
+class _NullStep(object):
+    """
+        Stand-in for _Step when tracing is disabled.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_result(self, factor):
+        pass
+
+_NULL_STEP = _NullStep()
+
+
+class Tracer(object):
+    """
+        Records factor operations and elimination steps while it is active,
+        i.e. inside its with block.
+
+        Every recorded event is a dictionary. Elimination steps contain the
+        kind of the step (e.g. "sum" or "max"), the eliminated variable,
+        the scopes of the factors in its bucket, the scope and shape of the
+        resulting factor, the bytes allocated by and the number of
+        multiply-adds of all its operations, its wall time and the list of
+        its operations. Operations outside of elimination steps are recorded
+        as events of their own.
+    """
+
+    def __init__(self, name: str = "trace"):
+        """
+            Parameters
+            ----------
+            name: String, optional
+                The name of the root frame in the flame summary.
+        """
+        self.name = name
+        self.events = []
+        self._steps = []
+
+    def __enter__(self):
+        _tracers.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _tracers.remove(self)
+        return False
+
+    def record(self, operation: str, inputs: List, result, seconds: float, mult_adds: int):
+        """
+            Records a single factor operation.
+
+            Parameters
+            ----------
+            operation: String
+                The name of the operation, e.g. "multiply".
+            inputs: list of ccbase.factor.Factor
+                The factors the operation was applied to.
+            result: ccbase.factor.Factor
+                The resulting factor.
+            seconds: float
+                The wall time of the operation.
+            mult_adds: int
+                The number of multiplications and additions performed.
+        """
+        event = OrderedDict([
+            ("type", "operation"), ("operation", operation),
+            ("scopes", [_scope(f) for f in inputs]),
+            ("result_scope", _scope(result)), ("shape", list(result.potentials.shape)),
+            ("bytes", int(result.potentials.nbytes)), ("seconds", seconds),
+            ("mult_adds", int(mult_adds))])
+        if self._steps:
+            self._steps[-1]._add(event)
+        else:
+            self.events.append(event)
+
+    def steps(self) -> List[dict]:
+        """
+            Returns all recorded elimination steps.
+        """
+        return [e for e in self.events if e["type"] == "step"]
+
+    def largest_step(self) -> Optional[dict]:
+        """
+            Returns the elimination step that allocated the most bytes, i.e.
+            the one creating the largest factors.
+        """
+        return max(self.steps(), key=lambda e: e["bytes"], default=None)
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """
+            Exports the recorded events as JSON.
+
+            Parameters
+            ----------
+            path: String, optional
+                If given, the JSON is also written to this file.
+
+            Returns
+            -------
+            String
+                The JSON representation of the events.
+        """
+        res = json.dumps({"name": self.name, "events": self.events}, indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(res)
+        return res
+
+    def flame_summary(self, metric: str = "seconds") -> str:
+        """
+            Summarizes the events in the folded stack format used by flame
+            graph tools, i.e. one line "root;step;operation value" per
+            distinct stack with the accumulated metric.
+
+            Parameters
+            ----------
+            metric: String, optional
+                One of "seconds" (reported in microseconds), "bytes" or "mult_adds".
+
+            Returns
+            -------
+            String
+                The folded stacks, separated by newlines.
+        """
+        def _value(event):
+            if metric == "seconds":
+                return event["seconds"] * 1e6
+            return event[metric]
+
+        stacks = OrderedDict()
+        for event in self.events:
+            if event["type"] == "step":
+                frame = "{}:{}".format(event["kind"], event["variable"])
+                operations = event["operations"]
+                # Time spent in the step outside of factor operations
+                own = _value(event) - sum(_value(o) for o in operations) if metric == "seconds" else 0
+                if own > 0:
+                    key = "{};{}".format(self.name, frame)
+                    stacks[key] = stacks.get(key, 0) + own
+            else:
+                frame, operations = None, [event]
+            for operation in operations:
+                key = ";".join(f for f in (self.name, frame, operation["operation"]) if f)
+                stacks[key] = stacks.get(key, 0) + _value(operation)
+        return "\n".join("{} {}".format(key, int(round(value))) for key, value in stacks.items())
+
+
+def active() -> Optional[Tracer]:
+    """
+        Returns the currently recording tracer, if any.
+    """
+    return _tracers[-1] if _tracers else None
+
+def step(kind: str, variable: str, factors: Iterable):
+    """
+        Returns a context manager recording an elimination step in the
+        active tracer. Does nothing if no tracer is active.
+
+        Parameters
+        ----------
+        kind: String
+            The kind of elimination, e.g. "sum" or "max".
+        variable: String
+            The eliminated variable.
+        factors: iterable of ccbase.factor.Factor
+            The factors before the elimination, the bucket is determined
+            from these.
+    """
+    if not _tracers:
+        return _NULL_STEP
+    return _Step(_tracers[-1], kind, variable, factors)
+
+def traced(operation: str, count_mult_adds):
+    """
+        Decorator for factor methods recording their calls in the active
+        tracer. count_mult_adds(self, result) computes the number of
+        multiply-adds of a call. Without an active tracer, only a single
+        check is added to every call.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not _tracers:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            inputs = [self] + [a for a in args if hasattr(a, "variable_order")]
+            _tracers[-1].record(operation, inputs, result, seconds, count_mult_adds(self, result))
+            return result
+        return wrapper
+    return decorator
@@ -16,6 +16,7 @@ last modified. 23.11.2021
 """
 
 import unittest
+import unittest.mock
 import random
 import assignment5 as solution
 
@@ -59,6 +60,22 @@ class TestAssignment5(unittest.TestCase):
         counts = len([i for i in filter(lambda x: x == outcome, samples)])
         self.assertAlmostEqual(counts/num_samples, distr[outcome], 1, "Sample frequency not matching actual distribution")
 
+    def test_sample_batch(self):
+        rng = np.random.default_rng(0)
+        codes = solution.sample_batch([0.2, 0.0, 0.8], 10000, rng)
+        frequencies = np.bincount(codes, minlength=3) / 10000
+        np.testing.assert_almost_equal(frequencies, [0.2, 0.0, 0.8], 1)
+        self.assertEqual(frequencies[1], 0)
+        # Sampling from all rows of a CPT with alias tables
+        cpt = solution.get_wetgrass_network().nodes["wet_grass"].cpt
+        table = solution.AliasTable.from_cpt(cpt)
+        for row, distribution in enumerate(np.moveaxis(cpt, 0, -1).reshape(-1, 2)):
+            codes = table.sample(row, rng, n=10000)
+            np.testing.assert_almost_equal(np.bincount(codes, minlength=2) / 10000, distribution, 1)
+        # Outcomes with probability 0 are never sampled, even for a random value of 0
+        with unittest.mock.patch("random.random", return_value=0.0):
+            self.assertEqual(solution.sample({"a": 0.0, "b": 1.0}), "b")
+
     def test_get_ancestral_ordering(self):
         net = solution.get_wetgrass_network()
         ancestral_ordering = solution.get_ancestral_ordering(net)
@@ -67,6 +84,18 @@ class TestAssignment5(unittest.TestCase):
                 self.assertFalse(net.is_ancestor(n2,n))
 
 
+    def test_get_topological_order(self):
+        net = solution.get_wetgrass_network()
+        self.assertEqual(solution.get_ancestral_ordering(net),
+                            ["winter", "sprinkler", "rain", "wet_grass", "dry_fields"])
+        # The cached order is updated when the structure changes
+        net.add_edge("dry_fields", "sprinkler")
+        self.assertEqual(net.get_topological_order(),
+                            ["winter", "rain", "dry_fields", "sprinkler", "wet_grass"])
+        net.add_edge("wet_grass", "winter")
+        with self.assertRaises(ValueError):
+            net.get_topological_order()
+
     def test_do_forward_sampling(self):
         net = solution.get_wetgrass_network()
         query = "sprinkler"
@@ -77,6 +106,32 @@ class TestAssignment5(unittest.TestCase):
         for i, outcome in enumerate(query_node.outcomes):
             self.assertAlmostEqual(res[outcome], true_res[i], 1, "Probability for {} wrong.".format(outcome))
 
+    def test_forward_sample_matrix(self):
+        net = solution.get_wetgrass_network()
+        samples = solution.forward_sample_matrix(net, 100000, np.random.default_rng(0))
+        self.assertEqual(samples.shape, (100000, len(net.nodes)))
+        self.assertEqual(samples.dtype, np.int8)
+        for column, name in enumerate(net.nodes):
+            frequencies = np.bincount(samples[:, column], minlength=2) / 100000
+            np.testing.assert_almost_equal(frequencies, net.marginals(name), 2)
+        # Seeded generators give reproducible samples
+        np.testing.assert_array_equal(solution.forward_sample_matrix(net, 10, np.random.default_rng(1)),
+                                        solution.forward_sample_matrix(net, 10, np.random.default_rng(1)))
+
+    def test_do_likelihood_weighting(self):
+        net = solution.get_wetgrass_network()
+        evidence = {"dry_fields": "True", "wet_grass": "False"}
+        marginals, ess = solution.do_likelihood_weighting(net, evidence, 20000, np.random.default_rng(0))
+        self.assertEqual(marginals["dry_fields"], {"True": 1.0, "False": 0.0})
+        for name, node in net.nodes.items():
+            true_res = net.marginals(name, evidence)
+            for i, outcome in enumerate(node.outcomes):
+                self.assertAlmostEqual(marginals[name][outcome], true_res[i], 1)
+        self.assertGreater(ess, 1000)
+        self.assertLessEqual(ess, 20000)
+        with self.assertRaises(ValueError):
+            solution.do_likelihood_weighting(net, evidence, 0)
+
     def test_get_markov_distr_simple(self):
         net = self.get_trivial_net()
         a = net.nodes["A"]
@@ -99,6 +154,103 @@ class TestAssignment5(unittest.TestCase):
         for i, outcome in enumerate(query_node.outcomes):
             self.assertAlmostEqual(res[outcome], true_res[i], 1, "Probability for {} wrong.".format(outcome))
 
+    def test_gibbs_sampler(self):
+        net = solution.get_wetgrass_network()
+        evidence = {"wet_grass": "True"}
+        sampler = solution.GibbsSampler(net, evidence, np.random.default_rng(0))
+        sampler.run(5000, burn_in=100)
+        # Only the counts are accumulated, continuing the chain reuses them
+        counts = sampler.counts
+        sampler.run(5000)
+        self.assertIs(sampler.counts, counts)
+        self.assertEqual(sampler.num_samples, 10000)
+        marginals = sampler.marginals()
+        self.assertEqual(marginals["wet_grass"], {"True": 1.0, "False": 0.0})
+        for name, node in net.nodes.items():
+            true_res = net.marginals(name, evidence)
+            for i, outcome in enumerate(node.outcomes):
+                self.assertAlmostEqual(marginals[name][outcome], true_res[i], 1)
+        res = solution.do_gibbs_sampling(net, "rain", evidence, 2000, rng=np.random.default_rng(1))
+        self.assertAlmostEqual(res["True"], net.marginals("rain", evidence)[0], 1)
+
+    def test_do_multi_chain_gibbs_sampling(self):
+        net = solution.get_wetgrass_network()
+        evidence = {"wet_grass": "True"}
+        res, diagnostics = solution.do_multi_chain_gibbs_sampling(net, "sprinkler", evidence, seed=3)
+        self.assertTrue(diagnostics["converged"])
+        self.assertLessEqual(diagnostics["r_hat"], 1.01)
+        self.assertGreaterEqual(diagnostics["ess"], 1000)
+        true_res = net.marginals("sprinkler", evidence)
+        for i, outcome in enumerate(net.nodes["sprinkler"].outcomes):
+            self.assertAlmostEqual(res[outcome], true_res[i], 1)
+        # The chains have their own seeded streams, independent of the process pool
+        self.assertEqual(solution.do_multi_chain_gibbs_sampling(net, "sprinkler", evidence, seed=3, parallel=False),
+                            (res, diagnostics))
+        self.assertEqual(solution.do_multi_chain_gibbs_sampling(net, "sprinkler", evidence, seed=3, max_workers=2),
+                            (res, diagnostics))
+        # Chains stuck in different regions are detected
+        shifted = np.random.default_rng(0).random((4, 20)) + np.arange(4)[:, None]
+        self.assertGreater(solution.split_r_hat(shifted), 1.5)
+
+    def test_do_multi_chain_gibbs_sampling_stuck_chains(self):
+        # Y is a deterministic copy of X, so single-site updates can never change X
+        net = solution.BayesianNetwork()
+        x = solution.DiscreteVariable("X", ["T", "F"])
+        y = solution.DiscreteVariable("Y", ["T", "F"])
+        net.add_node(x)
+        net.add_node(y)
+        net.add_edge(x, y)
+        x.set_probability_table(np.array([0.5, 0.5]))
+        y.set_probability_table(np.array([[1.0, 0.0], [0.0, 1.0]]))
+        for seed in (0, 3):
+            _, diagnostics = solution.do_multi_chain_gibbs_sampling(net, "X", {}, seed=seed, 
+                                                                    max_samples=1000, parallel=False)
+            self.assertFalse(diagnostics["converged"])
+            self.assertEqual(diagnostics["r_hat"], np.inf)
+            self.assertEqual(diagnostics["ess"], 0)
+            self.assertEqual(diagnostics["samples"], 1000)
+        # The sample limit is never exceeded by a full batch
+        with self.assertRaises(ValueError):
+            solution.do_multi_chain_gibbs_sampling(net, "X", {}, max_samples=10, parallel=False)
+        _, diagnostics = solution.do_multi_chain_gibbs_sampling(net, "X", {}, max_samples=120, parallel=False)
+        self.assertEqual(diagnostics["samples"], 100)
+        # Stuck chains that disagree are detected as well
+        stuck = np.repeat([[1.0], [0.0], [1.0], [0.0]], 20, axis=1)
+        self.assertEqual(solution.split_r_hat(stuck), np.inf)
+        self.assertEqual(solution.batch_means_ess(stuck, 50), 0)
+
+    def test_blocked_and_collapsed_gibbs_sampling(self):
+        # Two strongly coupled variables, single-site updates rarely flip them
+        net = solution.BayesianNetwork()
+        x = solution.DiscreteVariable("X", ["True", "False"])
+        y = solution.DiscreteVariable("Y", ["True", "False"])
+        net.add_node(x)
+        net.add_node(y)
+        net.add_edge(x, y)
+        x.set_probability_table(np.array([0.5, 0.5]))
+        y.set_probability_table(np.array([[0.99, 0.01], [0.01, 0.99]]))
+        options = dict(seed=0, min_ess=np.inf, max_samples=2000, parallel=False)
+        _, single = solution.do_multi_chain_gibbs_sampling(net, "X", {}, **options)
+        res, blocked = solution.do_multi_chain_gibbs_sampling(net, "X", {}, blocks=[["X", "Y"]], **options)
+        self.assertAlmostEqual(res["True"], 0.5, 1)
+        self.assertGreater(blocked["ess"], 10 * single["ess"])
+        res, collapsed = solution.do_multi_chain_gibbs_sampling(net, "Y", {}, collapsed=["X"], **options)
+        self.assertAlmostEqual(res["True"], 0.5, 1)
+        self.assertGreater(collapsed["ess"], 10 * single["ess"])
+
+        net = solution.get_wetgrass_network()
+        evidence = {"dry_fields": "True"}
+        sampler = solution.GibbsSampler(net, evidence, np.random.default_rng(0),
+                                        blocks=[["winter", "sprinkler"]], collapsed=["rain"])
+        sampler.run(5000, burn_in=100)
+        for name in ("winter", "sprinkler", "wet_grass"):
+            for i, outcome in enumerate(net.nodes[name].outcomes):
+                self.assertAlmostEqual(sampler.marginal(name)[outcome], net.marginals(name, evidence)[i], 1)
+        with self.assertRaises(ValueError):
+            sampler.marginal("rain")
+        with self.assertRaises(ValueError):
+            solution.GibbsSampler(net, evidence, blocks=[["rain", "dry_fields"]])
+
     def test_expected_utility(self):
         utilities = {"wet_grass": [20,-10], "dry_fields": [-20, 10]}
         net = solution.get_wetgrass_network()